@@ -1,24 +1,179 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import time
+STARTUP_STARTED = time.perf_counter()  # Startup timings are measured from the first import
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, stream_with_context
 import cv2
 import numpy as np
 import os
+import json
+import multiprocessing
+import tempfile
 from werkzeug.utils import secure_filename
 import uuid
-from ultralytics import YOLO
-from pyzbar.pyzbar import decode as pyzbar_decode
-import pylibdmtx
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from result_cache import ResultCache
+from backends import load_model, predict_boxes
+from inference_server import InferenceClient, process_memory
+from scanner_core import Scanner, decode_in_process, init_process_scanner, parse_symbologies
+from scheduler import InferenceScheduler, SchedulerBusy
+from video_scan import VIDEO_EXTENSIONS, FrameSampler, VideoReader
+from live_stream import LiveStream
+from job_queue import JobQueue, JobQueueFull
+from image_store import ImageStore
+from metrics import Metrics
+try:
+    from flask_sock import Sock
+except ImportError:  # Live camera streaming (/stream) is optional
+    Sock = None
 
 app = Flask(__name__)
 
+# Seconds from STARTUP_STARTED to each startup milestone, reported on /readyz
+startup_times = {}
+
+def mark_startup(milestone):
+    startup_times[milestone] = round(time.perf_counter() - STARTUP_STARTED, 3)
+    print(f"Startup: {milestone} after {startup_times[milestone]:.3f}s", file=sys.stderr, flush=True)
+
+mark_startup('imports')
+
+# Pipeline metrics served on /metrics (METRICS=0 turns counters and stage timers into no-ops)
+metrics = Metrics(enabled=os.environ.get('METRICS', '1') == '1')
+http_requests = metrics.counter('scanner_http_requests_total', 'HTTP requests by endpoint and status',
+                                ('endpoint', 'status'))
+request_seconds = metrics.histogram('scanner_request_seconds', 'HTTP request latency by endpoint', ('endpoint',))
+images_total = metrics.counter('scanner_images_total', 'Images processed, by outcome', ('outcome',))
+detections_total = metrics.counter('scanner_detections_total', 'Decoded codes, by symbology', ('type',))
+decode_failures = metrics.counter('scanner_decode_failures_total', 'Detected boxes that did not decode, by class',
+                                  ('symbology',))
+decode_seconds = metrics.histogram('scanner_decode_seconds', 'Time per decoder pass, by symbology', ('symbology',))
+boxes_below_threshold = metrics.counter('scanner_boxes_below_threshold_total',
+                                        'YOLO boxes dropped for confidence below CONFIDENCE_THRESHOLD')
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'gif'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '16')) * 1024 * 1024  # 16MB max by default
+CONFIDENCE_THRESHOLD = 0.5
+BATCH_SIZE = 16  # Images per YOLO forward pass in /decode/batch
+MAX_BATCH_FILES = 64  # Max images accepted by a single /decode/batch request
+# Decode uploads straight from the request body instead of saving them to UPLOAD_FOLDER
+app.config['IN_MEMORY_DECODE'] = os.environ.get('IN_MEMORY_DECODE', '0') == '1'
 
 # Load YOLO model (keep this in your project directory)
 MODEL_PATH = 'best.pt'  # Your trained YOLO model
-model = YOLO(MODEL_PATH)
+# Inference backend: torch (default), onnx (ONNX Runtime) or openvino
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+INFERENCE_INT8 = os.environ.get('INFERENCE_INT8', '0') == '1'
+# Images directory (onnx) or dataset YAML (openvino) used to calibrate INT8 models
+INFERENCE_CALIBRATION_DATA = os.environ.get('INFERENCE_CALIBRATION_DATA') or None
+# Unix socket of a shared inference process (see inference_server.py). When set, this
+# worker doesn't load the model and sends its images to that process instead.
+INFERENCE_SERVER = os.environ.get('INFERENCE_SERVER') or None
+inference_client = InferenceClient(INFERENCE_SERVER) if INFERENCE_SERVER else None
+# Intra-op threads for torch inference (unset keeps torch's default of one per core)
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', '0'))
+# The model loads and warms up on a background thread so the app can answer probes meanwhile;
+# inference waits up to MODEL_LOAD_TIMEOUT seconds for it
+MODEL_LOAD_TIMEOUT = float(os.environ.get('MODEL_LOAD_TIMEOUT', '300'))
+WARMUP_SIZE = 640
+model = None
+model_error = None
+model_ready = threading.Event()
+
+def load_and_warm_up():
+    """Load the detector and run one dummy inference so the first request doesn't pay for warm-up"""
+    global model, model_error
+    try:
+        if INFERENCE_THREADS > 0 and INFERENCE_BACKEND == 'torch':
+            import torch
+            torch.set_num_threads(INFERENCE_THREADS)
+        loaded = load_model(MODEL_PATH, INFERENCE_BACKEND, int8=INFERENCE_INT8,
+                            calibration_data=INFERENCE_CALIBRATION_DATA)
+        mark_startup('model_loaded')
+        predict_boxes(loaded, [np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)], 1)
+        model = loaded
+        mark_startup('warmed_up')
+    except Exception as e:
+        model_error = str(e)
+        app.logger.exception("Loading the model failed")
+    finally:
+        model_ready.set()
+
+if inference_client is None:
+    threading.Thread(target=load_and_warm_up, name='model-loader', daemon=True).start()
+
+# Cross-request micro-batching: queue images from concurrent requests and run them together
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '0') == '1'
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', '8'))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', '10'))
+MICRO_BATCH_QUEUE = int(os.environ.get('MICRO_BATCH_QUEUE', '256'))
+# Requests get 503 when the queue is full; work already accepted (jobs, video scans) retries after this pause
+BUSY_RETRY_SECONDS = 0.1
+
+# Parallel per-crop decoding. pyzbar and libdmtx are ctypes calls that release the
+# GIL, so threads scale; DECODE_POOL=process is there for decoders that don't. Its
+# workers start from a fresh forkserver/spawn process holding only a Scanner: forking
+# this one would copy the model and could deadlock on locks held by its threads.
+DECODE_POOL = os.environ.get('DECODE_POOL', 'thread')
+DECODE_WORKERS = int(os.environ.get('DECODE_WORKERS', str(os.cpu_count() or 1)))
+PARALLEL_DECODE_MIN_CROPS = int(os.environ.get('PARALLEL_DECODE_MIN_CROPS', '4'))
+
+# Symbologies to decode; YOLO boxes of other classes are skipped. DATAMATRIX_BUDGET_MS
+# is the total libdmtx time per crop (see scanner_core for the escalation ladder)
+SYMBOLOGIES = parse_symbologies(os.environ.get('SYMBOLOGIES', 'qr-code,data-matrix'))
+DATAMATRIX_BUDGET_MS = int(os.environ.get('DATAMATRIX_BUDGET_MS', '300'))
+scanner = Scanner(SYMBOLOGIES, datamatrix_budget_ms=DATAMATRIX_BUDGET_MS)
+
+# Tiled detection for high-resolution images: images whose longest side is at least
+# TILING_MIN_SIDE pixels (0 disables tiling) are split into overlapping tiles
+TILING_MIN_SIDE = int(os.environ.get('TILING_MIN_SIDE', '0'))
+TILE_SIZE = int(os.environ.get('TILE_SIZE', '1280'))
+TILE_OVERLAP = int(os.environ.get('TILE_OVERLAP', '256'))
+TILE_NMS_IOU = 0.5
+
+# Cascade: try a cheap whole-image decode first and only run YOLO when it finds nothing
+CASCADE = os.environ.get('CASCADE', '0') == '1'
+CASCADE_SYMBOLOGIES = set(os.environ.get('CASCADE_SYMBOLOGIES', 'qr-code,data-matrix').split(','))
+CASCADE_MAX_SIDE = int(os.environ.get('CASCADE_MAX_SIDE', '1024'))
+CASCADE_DATAMATRIX_BUDGET_MS = int(os.environ.get('CASCADE_DATAMATRIX_BUDGET_MS', '50'))
+cascade_counts = {'direct': 0, 'yolo': 0}
+cascade_lock = threading.Lock()
+
+# Cache of decode results keyed by image content (RESULT_CACHE_SIZE=0 disables it)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '1024'))
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_SIZE,
+    max_bytes=int(os.environ.get('RESULT_CACHE_MAX_MB', '32')) * 1024 * 1024,
+    ttl=int(os.environ.get('RESULT_CACHE_TTL', '3600')),
+    disk_dir=os.environ.get('RESULT_CACHE_DIR') or None,
+    disk_max_entries=int(os.environ.get('RESULT_CACHE_DISK_MAX_ENTRIES', '100000')),
+    disk_max_bytes=int(os.environ.get('RESULT_CACHE_DISK_MAX_MB', '256')) * 1024 * 1024
+) if RESULT_CACHE_SIZE > 0 else None
+
+# Live camera streams over WebSocket (/stream): each one holds one of the worker's WEB_THREADS
+# gunicorn threads while open, so the default cap per worker leaves half of them for requests,
+# health checks and turning away extra streams
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '8'))
+LIVE_STREAM_MAX = int(os.environ.get('LIVE_STREAM_MAX', str(max(WEB_THREADS // 2, 1))))
+live_streams = set()
+# Frame counters of streams that have closed; open ones are summed in on demand
+stream_counts = {'opened': 0, 'rejected': 0, 'frames_received': 0, 'frames_decoded': 0, 'frames_dropped': 0}
+stream_lock = threading.Lock()
+sock = Sock(app) if Sock is not None else None
+
+# Async decode jobs (/jobs): JOB_WORKERS threads drain a queue of at most JOB_QUEUE_SIZE images
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '64'))
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', '600'))
+JOB_MAX_WAIT = 30  # Longest long-poll a client can ask for, in seconds
+
+# Keep annotated images and job states in UPLOAD_FOLDER so any worker can serve them;
+# on by default with the shared inference server, which exists to run several workers
+SHARE_ACROSS_WORKERS = os.environ.get('SHARE_ACROSS_WORKERS', '1' if INFERENCE_SERVER else '0') == '1'
 
 # Ensure upload folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -26,107 +181,517 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def decode_datamatrix(image):
-    """Decode Data Matrix using libdmtx"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    messages = libdmtx.decode(gray)
-    results = []
-    
-    for msg in messages:
-        data = msg.data.decode('utf-8')
-        rect = msg.rect
-        points = [
-            (rect.left, rect.top),
-            (rect.left + rect.width, rect.top),
-            (rect.left + rect.width, rect.top + rect.height),
-            (rect.left, rect.top + rect.height)
-        ]
-        
-        results.append({
-            'type': 'DATA-MATRIX',
-            'data': data,
-            'points': points,
-            'rect': {
-                'left': rect.left,
-                'top': rect.top,
-                'width': rect.width,
-                'height': rect.height
-            }
-        })
+def pipeline_signature(exhaustive=False):
+    """Describe everything besides the image that affects decode results"""
+    try:
+        model_version = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        model_version = None
+    cascade = (f"{sorted(CASCADE_SYMBOLOGIES)},{CASCADE_MAX_SIDE},{CASCADE_DATAMATRIX_BUDGET_MS}"
+               if use_cascade(exhaustive) else 'off')
+    return (f"{MODEL_PATH}|{model_version}|{INFERENCE_BACKEND}|int8={INFERENCE_INT8}"
+            f"|conf={CONFIDENCE_THRESHOLD}|symbologies={','.join(SYMBOLOGIES)}|dm_budget={DATAMATRIX_BUDGET_MS}"
+            f"|tiling={TILING_MIN_SIDE},{TILE_SIZE},{TILE_OVERLAP}|cascade={cascade}")
+
+def use_cascade(exhaustive=False):
+    return CASCADE and not exhaustive
+
+def result_path(detections):
+    """Which pipeline produced a response: 'direct' when the cascade skipped YOLO"""
+    if detections and detections[0].get('path') == 'direct':
+        return 'direct'
+    return 'yolo'
+
+def request_flag(name, default=True):
+    """Read a boolean flag (e.g. annotate=false) from the query string or form"""
+    value = request.values.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+@metrics.stage('imdecode')
+def decode_image_bytes(data):
+    """Decode an encoded image (PNG, JPEG, ...) held in memory"""
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+def infer_batch(images):
+    """Run YOLO on a list of images in batches of BATCH_SIZE, returning boxes per image"""
+    if not model_ready.wait(MODEL_LOAD_TIMEOUT):
+        raise RuntimeError("The model is still loading, try again later")
+    if model is None:
+        raise RuntimeError(f"The model failed to load: {model_error}")
+    return predict_boxes(model, images, BATCH_SIZE)
+
+# With micro-batching on, only the scheduler thread calls the model. The inference
+# server batches across all workers itself, so workers using it don't need one.
+scheduler = InferenceScheduler(
+    infer_batch,
+    max_batch_size=MICRO_BATCH_SIZE,
+    max_wait_ms=MICRO_BATCH_WAIT_MS,
+    max_queue=MICRO_BATCH_QUEUE
+) if MICRO_BATCHING and inference_client is None else None
+
+def infer_images(images):
+    """Detect boxes in each image, through the inference server or micro-batching scheduler when enabled"""
+    if inference_client is not None:
+        return inference_client.infer(images)
+    if scheduler is not None:
+        return scheduler.infer_many(images)
+    return infer_batch(images)
+
+def tile_starts(length):
+    """Start offsets of TILE_SIZE windows overlapping by TILE_OVERLAP that cover length"""
+    if length <= TILE_SIZE:
+        return [0]
+    stride = max(TILE_SIZE - TILE_OVERLAP, 1)
+    starts = list(range(0, length - TILE_SIZE, stride))
+    starts.append(length - TILE_SIZE)
+    return starts
+
+def make_tiles(image):
+    """Split an image into (x, y, tile) views; the whole image is included for codes larger than a tile"""
+    height, width = image.shape[:2]
+    tiles = [(0, 0, image)]
+    for y in tile_starts(height):
+        for x in tile_starts(width):
+            tiles.append((x, y, image[y:y + TILE_SIZE, x:x + TILE_SIZE]))
+    return tiles
+
+def merge_tile_boxes(boxes):
+    """Cross-tile NMS per class, keeping the most confident of overlapping boxes"""
+    merged = []
+    for class_name in sorted({box[5] for box in boxes}):
+        class_boxes = [box for box in boxes if box[5] == class_name]
+        rects = [[x1, y1, x2 - x1, y2 - y1] for x1, y1, x2, y2, _, _ in class_boxes]
+        scores = [box[4] for box in class_boxes]
+        keep = cv2.dnn.NMSBoxes(rects, scores, 0.0, TILE_NMS_IOU)
+        merged.extend(class_boxes[i] for i in np.array(keep).flatten())
+    return sorted(merged, key=lambda box: -box[4])
+
+@metrics.stage('inference')
+def run_detection(images):
+    """Detect boxes in each image, tiling images of TILING_MIN_SIDE pixels or more.
+
+    All tiles of all images go through the model as one batch. Boxes are mapped
+    back to full-resolution coordinates; boxes cut by an inner tile edge are
+    dropped, since the overlapping tile (or the whole-image pass) sees the
+    complete code.
+    """
+    if TILING_MIN_SIDE <= 0 or all(max(image.shape[:2]) < TILING_MIN_SIDE for image in images):
+        return infer_images(images)
     
-    return results
+    tiled = [max(image.shape[:2]) >= TILING_MIN_SIDE for image in images]
+    tiles = []  # (image_index, x, y, tile)
+    for index, image in enumerate(images):
+        if tiled[index]:
+            tiles.extend((index, x, y, tile) for x, y, tile in make_tiles(image))
+        else:
+            tiles.append((index, 0, 0, image))
+    
+    boxes_per_image = [[] for _ in images]
+    for (index, x, y, tile), boxes in zip(tiles, infer_images([tile for _, _, _, tile in tiles])):
+        height, width = images[index].shape[:2]
+        tile_height, tile_width = tile.shape[:2]
+        for x1, y1, x2, y2, confidence, class_name in boxes:
+            # Skip boxes touching a tile edge that lies inside the image
+            if ((x1 <= 1 and x > 0) or (y1 <= 1 and y > 0) or
+                    (x2 >= tile_width - 1 and x + tile_width < width) or
+                    (y2 >= tile_height - 1 and y + tile_height < height)):
+                continue
+            boxes_per_image[index].append((x1 + x, y1 + y, x2 + x, y2 + y, confidence, class_name))
+    
+    return [merge_tile_boxes(boxes) if tiled[index] else boxes
+            for index, boxes in enumerate(boxes_per_image)]
 
-def detect_and_decode(image_path):
-    try:
-        image = cv2.imread(image_path)
-        if image is None:
-            return None, "Could not read the image file"
+def decode_crop(job):
+    """Decode one (class_name, crop) pair, returning (results, seconds per symbology)"""
+    class_name, cropped = job
+    timings = {}
+    decoded = scanner.decode(cropped, symbologies=(class_name,), timings=timings)
+    return decoded, timings
+
+if DECODE_WORKERS > 1 and DECODE_POOL == 'process':
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    decode_pool = ProcessPoolExecutor(max_workers=DECODE_WORKERS,
+                                      mp_context=multiprocessing.get_context(start_method),
+                                      initializer=init_process_scanner,
+                                      initargs=(SYMBOLOGIES, DATAMATRIX_BUDGET_MS))
+    pool_decode = decode_in_process
+elif DECODE_WORKERS > 1:
+    decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS)
+    pool_decode = decode_crop
+else:
+    decode_pool = None
+
+def record_decode_timings(timings):
+    """Report decoder time per symbology to the metrics and the request's breakdown"""
+    for symbology, seconds in timings.items():
+        decode_seconds.observe(seconds, symbology)
+        metrics.add_to_breakdown(f"decode:{symbology}", seconds)
 
-        # Detect codes with YOLO
-        results = model(image)
-        detections = []
+def decode_crops(jobs):
+    """Decode crops in order, spreading them over decode_pool when there are enough"""
+    if decode_pool is not None and len(jobs) >= PARALLEL_DECODE_MIN_CROPS:
+        # map() yields results in submission order, so output stays deterministic
+        return list(decode_pool.map(pool_decode, jobs))
+    return [decode_crop(job) for job in jobs]
+
+@metrics.stage('decode')
+def decode_boxes(image, boxes):
+    """Crop and decode every detected box, mapping results back to image coordinates"""
+    detections = []
+    height, width = image.shape[:2]
+    crops = []  # (x1, y1, confidence, class_name) of each crop, in box order
+    jobs = []
+    
+    for x1, y1, x2, y2, confidence, class_name in boxes:
+        if confidence < CONFIDENCE_THRESHOLD:
+            boxes_below_threshold.inc()
+            continue
         
-        for result in results:
-            for box in result.boxes:
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = model.names[class_id]
-                
-                if confidence < 0.5:  # Confidence threshold
-                    continue
-                
-                # Crop the detected code
-                cropped = image[y1:y2, x1:x2]
-                
-                # Decode based on type
-                if class_name == 'qr-code':
-                    decoded = pyzbar_decode(cropped)
-                    code_type = 'QR-CODE'
-                elif class_name == 'data-matrix':
-                    decoded = decode_datamatrix(cropped)
-                    code_type = 'DATA-MATRIX'
-                else:
-                    continue
-                
-                if not decoded:
-                    continue
-                
-                # Adjust coordinates to original image
-                for obj in decoded:
-                    detections.append({
-                        'type': code_type,
-                        'data': obj['data'],
-                        'points': [(x1 + p[0], y1 + p[1]) for p in obj['points']],
-                        'rect': {
-                            'left': x1 + obj['rect']['left'],
-                            'top': y1 + obj['rect']['top'],
-                            'width': obj['rect']['width'],
-                            'height': obj['rect']['height']
-                        },
-                        'confidence': confidence
-                    })
+        if not scanner.enabled(class_name):
+            continue
+        
+        # Crop the detected code
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, width), min(y2, height)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        crops.append((x1, y1, confidence, class_name))
+        jobs.append((class_name, image[y1:y2, x1:x2]))
+    
+    for (x1, y1, confidence, class_name), (decoded, timings) in zip(crops, decode_crops(jobs)):
+        code_type = scanner.result_type(class_name)
+        record_decode_timings(timings)
+        if not decoded:
+            decode_failures.inc(class_name)
         
-        # Draw on image
-        for detection in detections:
-            points = np.array(detection['points'], dtype=np.int32)
-            cv2.polylines(image, [points], True, (0, 255, 0), 2)
-            cv2.putText(image, 
-                       f"{detection['type']}: {detection['data']}", 
-                       (detection['rect']['left'], detection['rect']['top'] - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        # Adjust coordinates to original image
+        for obj in decoded:
+            detections.append({
+                'type': code_type,
+                'data': obj['data'],
+                'points': [(x1 + p[0], y1 + p[1]) for p in obj['points']],
+                'rect': {
+                    'left': x1 + obj['rect']['left'],
+                    'top': y1 + obj['rect']['top'],
+                    'width': obj['rect']['width'],
+                    'height': obj['rect']['height']
+                },
+                'confidence': confidence,
+                'path': 'yolo'
+            })
+            if 'stage' in obj:
+                detections[-1]['decode_stage'] = obj['stage']
+    
+    return detections
+
+@metrics.stage('cascade')
+def direct_decode(image):
+    """Decode the downscaled whole image without YOLO, for clean frame-filling codes.
+
+    Every enabled CASCADE_SYMBOLOGIES decoder runs, so an image holding a QR
+    code and a Data Matrix reports both, and libdmtx only gets
+    CASCADE_DATAMATRIX_BUDGET_MS. Returns detections in decode_boxes' format
+    with a confidence of None, or an empty list when nothing was found.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, CASCADE_MAX_SIDE / max(gray.shape[:2]))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    timings = {}
+    decoded = scanner.decode(gray, symbologies=CASCADE_SYMBOLOGIES, budget_ms=CASCADE_DATAMATRIX_BUDGET_MS,
+                             timings=timings, full_frame=True)
+    record_decode_timings(timings)
+    
+    detections = []
+    for obj in decoded:
+        detections.append({
+            'type': obj['type'],
+            'data': obj['data'],
+            'points': [(int(p[0] / scale), int(p[1] / scale)) for p in obj['points']],
+            'rect': {
+                'left': int(obj['rect']['left'] / scale),
+                'top': int(obj['rect']['top'] / scale),
+                'width': int(obj['rect']['width'] / scale),
+                'height': int(obj['rect']['height'] / scale)
+            },
+            'confidence': None,
+            'path': 'direct'
+        })
+        if 'stage' in obj:
+            detections[-1]['decode_stage'] = obj['stage']
+    return detections
+
+def count_path(detections):
+    """Record whether the cascade skipped YOLO for an image"""
+    path = result_path(detections)
+    with cascade_lock:
+        cascade_counts[path] += 1
+    return path
+
+def annotate_image(image, detections):
+    """Draw detections on a copy of the image"""
+    image = image.copy()
+    for detection in detections:
+        points = np.array(detection['points'], dtype=np.int32)
+        cv2.polylines(image, [points], True, (0, 255, 0), 2)
+        cv2.putText(image, 
+                   f"{detection['type']}: {detection['data']}", 
+                   (detection['rect']['left'], detection['rect']['top'] - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    return image
+
+def render_annotated(source, detections):
+    """Image store renderer: annotated JPEG bytes for an image source, or None if it is gone"""
+    if isinstance(source, np.ndarray):
+        image = source
+    elif isinstance(source, str):
+        image = cv2.imread(source)
+    else:
+        image = decode_image_bytes(source)
+    if image is None:
+        return None
+    with metrics.stage('render'):
+        ok, jpeg = cv2.imencode('.jpg', annotate_image(image, detections))
+    return jpeg.tobytes() if ok else None
+
+# Annotated images are drawn on first fetch from /uploads/<name>, not when decoding
+image_store = ImageStore(
+    render_annotated,
+    max_bytes=int(os.environ.get('IMAGE_STORE_MAX_MB', '256')) * 1024 * 1024,
+    max_render_bytes=int(os.environ.get('RENDER_CACHE_MAX_MB', '64')) * 1024 * 1024,
+    ttl=int(os.environ.get('IMAGE_STORE_TTL', '3600')),
+    upload_dir=UPLOAD_FOLDER,
+    shared=SHARE_ACROSS_WORKERS
+)
+
+@metrics.stage('read')
+def read_image_source(image_source):
+    """Split an image path, encoded bytes or BGR array into (image, bytes).
+
+    Encoded bytes are returned undecoded (image is None) so a cache hit can
+    skip cv2.imdecode entirely; arrays have no bytes and are never cached.
+    """
+    if isinstance(image_source, np.ndarray):
+        return image_source, None
+    if isinstance(image_source, (bytes, bytearray, memoryview)):
+        return None, bytes(image_source)
+    with open(image_source, 'rb') as f:
+        return None, f.read()
+
+@metrics.stage('cache')
+def cached_results(data, exhaustive=False):
+    """Look up cached detections for encoded image bytes, returning (key, detections)"""
+    if result_cache is None or data is None:
+        return None, None
+    key = ResultCache.make_key(data, pipeline_signature(exhaustive))
+    return key, result_cache.get(key)
+
+def count_image(detections):
+    """Record one image's outcome (detections, or None on error) in the metrics"""
+    if detections is None:
+        images_total.inc('error')
+        return
+    images_total.inc('ok')
+    for detection in detections:
+        detections_total.inc(detection['type'])
+
+def detect_and_decode(image_source, annotate=True, exhaustive=False, use_cache=True):
+    """Detect and decode codes in an image path, encoded bytes or a BGR array.
+
+    With annotate, the image source and detections go to the image store and
+    the returned processed filename is only drawn when it is first fetched;
+    otherwise the processed filename is None. With the cascade enabled, YOLO
+    only runs when a direct decode finds nothing or exhaustive is True; each
+    detection's 'path' says which one produced it. use_cache=False skips the
+    result cache, for frames that are never sent twice. Failures come back as
+    (None, error message), except SchedulerBusy, which is raised so overload
+    can be answered with 503 rather than 500.
+    """
+    try:
+        image, data = read_image_source(image_source)
+        cache_key, detections = cached_results(data, exhaustive) if use_cache else (None, None)
         
-        # Save processed image
-        processed_filename = f"processed_{str(uuid.uuid4())}.jpg"
-        processed_path = os.path.join(app.config['UPLOAD_FOLDER'], processed_filename)
-        cv2.imwrite(processed_path, image)
+        if detections is None:
+            if image is None:
+                image = decode_image_bytes(data)
+            if image is None:
+                return None, "Could not read the image file"
+
+            detections = direct_decode(image) if use_cascade(exhaustive) else []
+            if not detections:
+                # Detect codes with YOLO
+                boxes = run_detection([image])[0]
+                detections = decode_boxes(image, boxes)
+            if use_cascade(exhaustive):
+                count_path(detections)
+            if cache_key is not None:
+                result_cache.put(cache_key, detections)
         
+        processed_filename = image_store.add(image_source, detections) if annotate else None
+        count_image(detections)
         return detections, processed_filename
     
+    except SchedulerBusy:
+        raise
     except Exception as e:
+        app.logger.exception("Decoding failed")
+        count_image(None)
         return None, str(e)
 
+def detect_and_decode_batch(image_sources, annotate=True, exhaustive=False, strict=False):
+    """Detect and decode a list of images with batched YOLO inference.
+
+    Accepts the same sources as detect_and_decode. Cached images (and, with the
+    cascade on, images a direct decode can read) are answered without
+    inference and only the rest go through the model. Returns one
+    (detections, processed_filename) pair per image, using the same
+    (None, error message) convention as detect_and_decode, which also raises
+    SchedulerBusy. With strict, any other failure of the model itself is
+    raised instead of reported for every image.
+    """
+    outputs = [None] * len(image_sources)
+    images = [None] * len(image_sources)
+    pending = []  # (index, cache_key) of images that need inference
+    
+    for index, image_source in enumerate(image_sources):
+        try:
+            image, data = read_image_source(image_source)
+            cache_key, detections = cached_results(data, exhaustive)
+            if image is None and detections is None:
+                image = decode_image_bytes(data)
+                if image is None:
+                    outputs[index] = (None, "Could not read the image file")
+                    continue
+            images[index] = image
+            if detections is None and use_cascade(exhaustive):
+                detections = direct_decode(image) or None
+                if detections is not None:
+                    count_path(detections)
+                    if cache_key is not None:
+                        result_cache.put(cache_key, detections)
+            if detections is None:
+                pending.append((index, cache_key))
+            else:
+                outputs[index] = detections
+        except Exception as e:
+            outputs[index] = (None, str(e))
+    
+    if pending:
+        try:
+            boxes_per_image = run_detection([images[index] for index, _ in pending])
+        except SchedulerBusy:
+            raise
+        except Exception as e:
+            if strict:
+                raise
+            boxes_per_image = None
+            for index, _ in pending:
+                outputs[index] = (None, str(e))
+        
+        for (index, cache_key), boxes in zip(pending, boxes_per_image or []):
+            try:
+                outputs[index] = decode_boxes(images[index], boxes)
+                if use_cascade(exhaustive):
+                    count_path(outputs[index])
+                if cache_key is not None:
+                    result_cache.put(cache_key, outputs[index])
+            except Exception as e:
+                outputs[index] = (None, str(e))
+    
+    for index, output in enumerate(outputs):
+        if isinstance(output, tuple):
+            continue
+        try:
+            processed_filename = image_store.add(image_sources[index], output) if annotate else None
+            outputs[index] = (output, processed_filename)
+        except Exception as e:
+            outputs[index] = (None, str(e))
+    for detections, _ in outputs:
+        count_image(detections)
+    return outputs
+
+def retry_when_busy(decode, *args, **kwargs):
+    """Call decode until the micro-batching queue has room for it"""
+    while True:
+        try:
+            return decode(*args, **kwargs)
+        except SchedulerBusy:
+            time.sleep(BUSY_RETRY_SECONDS)
+
+def run_decode_job(payload):
+    """Job queue handler: decode one uploaded image and build the /decode response body"""
+    data, annotate, exhaustive = payload
+    # The bounded job queue already limits the backlog, so an accepted job waits for room
+    results, processed_filename = retry_when_busy(detect_and_decode, data, annotate=annotate, exhaustive=exhaustive)
+    if results is None:
+        raise ValueError(processed_filename)
+    return {
+        'results': results,
+        'processed_image': processed_filename,
+        'path': result_path(results)
+    }
+
+job_queue = JobQueue(run_decode_job, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, result_ttl=JOB_RESULT_TTL,
+                     shared_dir=os.path.join(UPLOAD_FOLDER, 'jobs') if SHARE_ACROSS_WORKERS else None)
+
+def read_batch_uploads(files):
+    """Collect (filename, bytes) pairs from uploaded images and zip archives"""
+    uploads = []
+    for file in files:
+        if file.filename == '':
+            continue
+        
+        if file.filename.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not allowed_file(info.filename):
+                            continue
+                        if info.file_size > app.config['MAX_CONTENT_LENGTH']:
+                            raise ValueError(f"{info.filename} is too large")
+                        uploads.append((os.path.basename(info.filename), archive.read(info)))
+                        if len(uploads) > MAX_BATCH_FILES:
+                            return uploads
+            except zipfile.BadZipFile:
+                raise ValueError(f"{file.filename} is not a valid zip archive")
+        elif allowed_file(file.filename):
+            uploads.append((secure_filename(file.filename), file.read()))
+        else:
+            raise ValueError(f"Invalid file type: {file.filename}")
+        
+        if len(uploads) > MAX_BATCH_FILES:
+            break
+    return uploads
+
+def format_timings(timings):
+    """Round a stage breakdown (ms) for a response"""
+    return {stage: round(ms, 2) for stage, ms in timings.items()}
+
+@app.errorhandler(SchedulerBusy)
+def scheduler_busy(e):
+    """A full micro-batching queue means overload, not failure: ask the client to retry"""
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def count_request(response):
+    endpoint = request.endpoint or 'unknown'
+    if 'first_request' not in startup_times and endpoint not in ('healthz', 'readyz'):
+        mark_startup('first_request')
+    http_requests.inc(endpoint, response.status_code)
+    if 'request_start' in g:
+        request_seconds.observe(time.perf_counter() - g.request_start, endpoint)
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -141,28 +706,309 @@ def decode_image():
         return jsonify({'error': 'No selected file'}), 400
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        results, processed_filename = detect_and_decode(filepath)
+        annotate = request_flag('annotate')
+        exhaustive = request_flag('exhaustive', default=False)
+        with metrics.breakdown(request_flag('timings', default=False)) as timings:
+            if app.config['IN_MEMORY_DECODE']:
+                results, processed_filename = detect_and_decode(file.read(), annotate=annotate, exhaustive=exhaustive)
+            else:
+                # Prefix with a uuid so concurrent uploads with the same name don't collide
+                filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                file.save(filepath)
+                try:
+                    results, processed_filename = detect_and_decode(filepath, annotate=annotate,
+                                                                    exhaustive=exhaustive)
+                except SchedulerBusy:
+                    os.remove(filepath)
+                    raise
+                if results is None or processed_filename is None:
+                    # Only the image store keeps uploads around, to draw the annotated image later
+                    os.remove(filepath)
         
         if results is None:
             return jsonify({'error': processed_filename}), 500
         
-        return jsonify({
+        response = {
             'results': results,
-            'processed_image': processed_filename
-        })
+            'processed_image': processed_filename,
+            'path': result_path(results)
+        }
+        if timings is not None:
+            response['timings'] = format_timings(timings)
+        return jsonify(response)
     
     return jsonify({'error': 'Invalid file type'}), 400
 
+@app.route('/decode/batch', methods=['POST'])
+def decode_batch():
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    try:
+        uploads = read_batch_uploads(files)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not uploads:
+        return jsonify({'error': 'No images found'}), 400
+    if len(uploads) > MAX_BATCH_FILES:
+        return jsonify({'error': f'Too many images (max {MAX_BATCH_FILES})'}), 400
+    
+    items = []
+    with metrics.breakdown(request_flag('timings', default=False)) as timings:
+        outputs = detect_and_decode_batch([data for _, data in uploads], annotate=request_flag('annotate'),
+                                          exhaustive=request_flag('exhaustive', default=False))
+    for (filename, _), (results, processed_filename) in zip(uploads, outputs):
+        item = {'filename': filename}
+        items.append(item)
+        if results is None:
+            item['error'] = processed_filename
+        else:
+            item['results'] = results
+            item['processed_image'] = processed_filename
+            item['path'] = result_path(results)
+    
+    if timings is not None:
+        return jsonify({'results': items, 'timings': format_timings(timings)})
+    return jsonify({'results': items})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an image for decoding and return its job id without waiting for the result"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    if scheduler is not None and scheduler.busy():
+        raise SchedulerBusy("Inference queue is full, try again later")
+    payload = (file.read(), request_flag('annotate'), request_flag('exhaustive', default=False))
+    try:
+        job = job_queue.submit(payload)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '1'}
+    
+    return jsonify(job.to_dict()), 202, {'Location': f'/jobs/{job.id}'}
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Job status and, once done, its results; wait=<seconds> long-polls until it finishes"""
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    job = job_queue.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/decode/video', methods=['POST'])
+def decode_video():
+    """Scan a video, streaming detections per sampled frame as server-sent events"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    if extension not in VIDEO_EXTENSIONS:
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    # cv2.VideoCapture needs a real file
+    fd, video_path = tempfile.mkstemp(suffix=f'.{extension}', dir=app.config['UPLOAD_FOLDER'])
+    os.close(fd)
+    file.save(video_path)
+    
+    try:
+        sampler = FrameSampler(
+            diff_threshold=float(request.values.get('diff_threshold', 6.0)),
+            max_gap=float(request.values.get('max_gap', 1.0))
+        )
+        reader = VideoReader(video_path, sampler, stride=int(request.values.get('stride', 1)))
+    except ValueError as e:
+        os.remove(video_path)
+        return jsonify({'error': str(e)}), 400
+    exhaustive = request_flag('exhaustive', default=False)
+    
+    def generate():
+        try:
+            for batch in reader.batches(BATCH_SIZE):
+                outputs = retry_when_busy(detect_and_decode_batch, [frame for _, _, frame in batch],
+                                          annotate=False, exhaustive=exhaustive)
+                for (index, timestamp, _), (results, error) in zip(batch, outputs):
+                    if results == []:
+                        continue
+                    event = {'frame': index, 'timestamp': round(timestamp, 3)}
+                    if results is None:
+                        event['error'] = error
+                    else:
+                        event['results'] = results
+                    yield sse_event('frame', event)
+            yield sse_event('done', reader.stats())
+        finally:
+            cleanup()
+    
+    def cleanup():
+        reader.close()
+        if os.path.exists(video_path):
+            os.remove(video_path)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also runs when the client goes away before the stream starts or it is never iterated
+    response.call_on_close(cleanup)
+    return response
+
+def decode_live_frame(data, exhaustive):
+    """Decode one stream frame; live frames are never resent, so they stay out of the result cache"""
+    try:
+        return detect_and_decode(data, annotate=False, exhaustive=exhaustive, use_cache=False)
+    except SchedulerBusy as e:
+        # The client just sends a newer frame
+        return None, str(e)
+
+if sock is not None:
+    @sock.route('/stream')
+    def live_stream(ws):
+        """Decode a live camera feed sent as binary JPEG/PNG frames, answering with JSON detections"""
+        with stream_lock:
+            full = len(live_streams) >= LIVE_STREAM_MAX
+            stream_counts['rejected' if full else 'opened'] += 1
+        if full:
+            ws.close(reason=1013, message='Too many live streams, try again later')
+            return
+        
+        exhaustive = request_flag('exhaustive', default=False)
+        stream = LiveStream(lambda data: decode_live_frame(data, exhaustive), ws.send)
+        with stream_lock:
+            live_streams.add(stream)
+        try:
+            while True:
+                data = ws.receive()
+                if isinstance(data, bytes):
+                    stream.push(data)
+        finally:
+            stream.close()
+            with stream_lock:
+                live_streams.discard(stream)
+                for name, value in stream.stats().items():
+                    stream_counts[name] += value
+
+@app.route('/stream/stats')
+def stream_stats():
+    with stream_lock:
+        counts = dict(stream_counts)
+        streams = list(live_streams)
+    for stream in streams:
+        for name, value in stream.stats().items():
+            counts[name] += value
+    return jsonify({
+        'enabled': sock is not None,
+        'active': len(streams),
+        'max_streams': LIVE_STREAM_MAX,
+        **counts
+    })
+
+@app.route('/jobs/stats')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/images/stats')
+def image_stats():
+    return jsonify(image_store.stats())
+
+metrics.gauge('scanner_worker_rss_bytes', 'Resident memory of this worker process',
+              lambda: process_memory()['rss'] or 0)
+metrics.gauge('scanner_job_queue_depth', 'Async decode jobs waiting for a worker', job_queue.depth)
+metrics.gauge('scanner_live_streams', 'Open live camera streams', lambda: len(live_streams))
+metrics.gauge('scanner_image_store_bytes', 'Bytes of image sources kept for lazy annotation',
+              lambda: image_store.stats()['source_bytes'])
+if scheduler is not None:
+    metrics.gauge('scanner_inference_queue_depth', 'Images waiting for the micro-batching scheduler',
+                  lambda: scheduler.stats()['queued'])
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the model is loaded and warmed up (or the inference server is reachable)"""
+    if inference_client is not None:
+        ready, error = inference_client.ready(), None
+    else:
+        ready, error = model_ready.is_set() and model is not None, model_error
+    body = {'ready': ready, 'startup': startup_times}
+    if error:
+        body['error'] = error
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/memory/stats')
+def memory_stats():
+    """Memory of this worker and, in shared inference mode, of the inference process and every worker using it"""
+    stats = {'worker': {'pid': os.getpid(), **process_memory()}}
+    if inference_client is not None:
+        try:
+            stats['inference_server'] = inference_client.stats()
+        except RuntimeError as e:
+            stats['inference_server'] = {'error': str(e)}
+    return jsonify(stats)
+
+@app.route('/cache/stats')
+def cache_stats():
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+@app.route('/scheduler/stats')
+def scheduler_stats():
+    if scheduler is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **scheduler.stats()})
+
+@app.route('/decoders/stats')
+def decoder_stats():
+    """Calls, decoded codes and mean time of each decoder pass in this process"""
+    return jsonify({'symbologies': list(SYMBOLOGIES), 'passes': scanner.stats()})
+
+@app.route('/cascade/stats')
+def cascade_stats():
+    with cascade_lock:
+        counts = dict(cascade_counts)
+    total = counts['direct'] + counts['yolo']
+    return jsonify({
+        'enabled': CASCADE,
+        **counts,
+        'skip_rate': counts['direct'] / total if total else 0.0
+    })
+
 @app.route('/uploads/<filename>')
 def serve_file(filename):
+    filename = secure_filename(filename)
+    jpeg = image_store.get(filename)
+    if jpeg is not None:
+        return Response(jpeg, mimetype='image/jpeg', headers={'Cache-Control': 'private, max-age=3600'})
     try:
-        return send_from_directory(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
     except FileNotFoundError:
         return "File not found", 404
 
+mark_startup('app_ready')
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+# Supported values for INFERENCE_BACKEND
+BACKENDS = ('torch', 'onnx', 'openvino')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def is_stale(exported_path, model_path):
+    """True when an exported model is missing or older than the .pt weights"""
+    if not os.path.exists(exported_path):
+        return True
+    return os.path.getmtime(exported_path) < os.path.getmtime(model_path)
+
+
+def exported_model_path(model_path, backend, int8=False):
+    """Where the exported copy of model_path for a backend lives"""
+    stem = os.path.splitext(model_path)[0]
+    if backend == 'onnx':
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == 'openvino':
+        # Same directory names ultralytics uses for its OpenVINO exports
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    return model_path
+
+
+def export_model(model_path, backend, int8=False, imgsz=640, calibration_data=None):
+    """Export the PyTorch weights for a backend, reusing an up-to-date export.
+
+    ONNX models are exported with a dynamic batch axis so batched requests work.
+    INT8 ONNX models are statically quantized with ONNX Runtime, calibrated on
+    the images in calibration_data when given (dynamic weight-only quantization
+    otherwise). INT8 OpenVINO models are quantized by ultralytics/NNCF, which
+    takes calibration_data as a dataset YAML.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend == 'torch':
+        return model_path
+
+    target = exported_model_path(model_path, backend, int8)
+    if not is_stale(target, model_path):
+        return target
+
+    # ultralytics pulls in torch; import it only once a model is actually needed
+    from ultralytics import YOLO
+    if backend == 'openvino':
+        export_args = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True, 'int8': int8}
+        if int8 and calibration_data:
+            export_args['data'] = calibration_data
+        return YOLO(model_path).export(**export_args)
+
+    fp32_path = exported_model_path(model_path, 'onnx')
+    if is_stale(fp32_path, model_path):
+        fp32_path = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=True)
+    if not int8:
+        return fp32_path
+
+    quantize_onnx(fp32_path, target, imgsz=imgsz, calibration_dir=calibration_data)
+    return target
+
+
+class ImageCalibrationReader:
+    """Feeds letterboxed images to ONNX Runtime's static quantization calibrator"""
+
+    def __init__(self, input_name, image_dir, imgsz=640, max_images=100):
+        paths = sorted(
+            path for path in glob.glob(os.path.join(image_dir, '*'))
+            if path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.paths = iter(paths[:max_images])
+
+    def get_next(self):
+        for path in self.paths:
+            image = cv2.imread(path)
+            if image is not None:
+                return {self.input_name: letterbox(image, self.imgsz)}
+        return None
+
+
+def letterbox(image, imgsz):
+    """Resize and pad a BGR image the way YOLO preprocesses it (NCHW float32 RGB)"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob)
+
+
+def quantize_onnx(fp32_path, int8_path, imgsz=640, calibration_dir=None):
+    """Quantize an ONNX model to INT8, keeping the ultralytics metadata"""
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    source = onnx.load(fp32_path)
+    if calibration_dir:
+        reader = ImageCalibrationReader(source.graph.input[0].name, calibration_dir, imgsz=imgsz)
+        quantize_static(
+            fp32_path, int8_path, reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+    else:
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+
+    # ultralytics reads class names, stride and imgsz from the model metadata
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, int8_path)
+
+
+def load_model(model_path, backend='torch', int8=False, imgsz=640, calibration_data=None):
+    """Load the detector for a backend, exporting it first when needed.
+
+    Every backend is wrapped in an ultralytics YOLO object, so callers get the
+    same Results objects, box format and class names as the PyTorch model.
+    """
+    from ultralytics import YOLO
+    path = export_model(model_path, backend, int8=int8, imgsz=imgsz, calibration_data=calibration_data)
+    if backend == 'torch':
+        return YOLO(path)
+    return YOLO(path, task='detect')
+
+
+def extract_boxes(result, names):
+    """Convert one YOLO result into (x1, y1, x2, y2, confidence, class_name) tuples"""
+    boxes = []
+    if result.boxes is None or len(result.boxes) == 0:
+        return boxes
+
+    xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+    confs = result.boxes.conf.cpu().numpy()
+    classes = result.boxes.cls.cpu().numpy().astype(int)
+    for (x1, y1, x2, y2), confidence, class_id in zip(xyxy, confs, classes):
+        boxes.append((int(x1), int(y1), int(x2), int(y2), float(confidence), names[int(class_id)]))
+    return boxes
+
+
+def predict_boxes(model, images, batch_size):
+    """Run the model on a list of images in batches of batch_size, returning boxes per image"""
+    boxes_per_image = []
+    for start in range(0, len(images), batch_size):
+        results = model(images[start:start + batch_size], verbose=False)
+        boxes_per_image.extend(extract_boxes(result, model.names) for result in results)
+    return boxes_per_image
@@ -0,0 +1,132 @@
+"""Compare detection accuracy and CPU latency of the inference backends.
+
+The PyTorch model is the reference: for every other backend we report how many
+of its boxes are found again (recall) and how many extra boxes appear
+(precision), next to mean latency and throughput.
+
+    python benchmarks/compare_backends.py path/to/images --int8 --calibration path/to/images
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backends import BACKENDS, IMAGE_EXTENSIONS, load_model  # noqa: E402
+
+
+def load_images(image_dir, limit):
+    paths = sorted(
+        path for path in glob.glob(os.path.join(image_dir, '*'))
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    images = [cv2.imread(path) for path in paths]
+    return [image for image in images if image is not None]
+
+
+def predict(model, images, batch_size, conf):
+    """Run the model over all images, returning per-image box arrays and seconds per image"""
+    boxes = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        for result in model(images[i:i + batch_size], conf=conf, verbose=False):
+            data = result.boxes
+            boxes.append(np.column_stack([
+                data.xyxy.cpu().numpy(),
+                data.cls.cpu().numpy()
+            ]) if len(data) else np.zeros((0, 5)))
+    elapsed = time.perf_counter() - start
+    return boxes, elapsed / max(len(images), 1)
+
+
+def iou(box, others):
+    x1 = np.maximum(box[0], others[:, 0])
+    y1 = np.maximum(box[1], others[:, 1])
+    x2 = np.minimum(box[2], others[:, 2])
+    y2 = np.minimum(box[3], others[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (others[:, 2] - others[:, 0]) * (others[:, 3] - others[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def match(reference, candidate, threshold):
+    """Count reference boxes matched by a same-class candidate box with IoU >= threshold"""
+    matched = 0
+    used = np.zeros(len(candidate), dtype=bool)
+    for box in reference:
+        options = np.where((candidate[:, 4] == box[4]) & ~used)[0] if len(candidate) else []
+        if len(options) == 0:
+            continue
+        overlaps = iou(box, candidate[options])
+        best = int(np.argmax(overlaps))
+        if overlaps[best] >= threshold:
+            used[options[best]] = True
+            matched += 1
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', help='Directory of test images')
+    parser.add_argument('--model', default='best.pt')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--int8', action='store_true', help='Also benchmark INT8 variants')
+    parser.add_argument('--calibration', help='Calibration images (onnx) or dataset YAML (openvino) for INT8')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--iou', type=float, default=0.5)
+    parser.add_argument('--json', help='Write the report to this file as JSON')
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        parser.error(f"No images found in {args.images}")
+
+    variants = [(backend, False) for backend in args.backends]
+    if args.int8:
+        variants += [(backend, True) for backend in args.backends if backend != 'torch']
+
+    reference = None
+    report = []
+    for backend, int8 in variants:
+        model = load_model(args.model, backend, int8=int8, calibration_data=args.calibration)
+        predict(model, images[:args.warmup], args.batch_size, args.conf)
+        boxes, seconds = predict(model, images, args.batch_size, args.conf)
+        if reference is None:
+            reference = boxes
+
+        ref_total = sum(len(b) for b in reference)
+        found_total = sum(len(b) for b in boxes)
+        matched = sum(match(ref, cand, args.iou) for ref, cand in zip(reference, boxes))
+        report.append({
+            'backend': backend,
+            'int8': int8,
+            'ms_per_image': seconds * 1000,
+            'images_per_second': 1 / seconds if seconds else 0.0,
+            'boxes': found_total,
+            'recall_vs_reference': matched / ref_total if ref_total else 1.0,
+            'precision_vs_reference': matched / found_total if found_total else 1.0,
+        })
+
+    print(f"{len(images)} images, batch size {args.batch_size}, reference: {variants[0][0]}")
+    print(f"{'backend':<16}{'ms/img':>10}{'img/s':>10}{'boxes':>8}{'recall':>9}{'precision':>11}")
+    for row in report:
+        name = row['backend'] + (' int8' if row['int8'] else '')
+        print(f"{name:<16}{row['ms_per_image']:>10.1f}{row['images_per_second']:>10.1f}{row['boxes']:>8}"
+              f"{row['recall_vs_reference']:>9.3f}{row['precision_vs_reference']:>11.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Benchmark the decode pipelines on a synthetic corpus and check for regressions.
+
+Each pipeline decodes every image of the corpus (see synthetic.py) once after
+a short warm-up. The report has throughput, p50/p95/p99 latency, peak traced
+memory and decode recall/precision against the known contents, overall and
+per case. Pipelines:
+
+    web          app.detect_and_decode with YOLO on every image
+    web-cascade  app.detect_and_decode with the cascade enabled
+    desktop      decoder.scan_frame, what the PyQt app runs on each frame
+
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+
+--compare exits with status 1 when recall drops or p95 latency grows by more
+than the given tolerances relative to the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import generate_corpus, load_corpus  # noqa: E402
+
+PIPELINES = ('web', 'web-cascade', 'desktop')
+
+# Result types reported by scanner_core, mapped to the corpus' symbology names
+TYPE_NAMES = {'QR-CODE': 'qr-code', 'DATA-MATRIX': 'data-matrix'}
+
+
+def web_pipeline(cascade):
+    import app
+    app.CASCADE = cascade
+    if app.result_cache is not None:
+        app.result_cache.clear()
+
+    def scan(image):
+        # Arrays are never served from the result cache, so every image is decoded
+        results, error = app.detect_and_decode(image, annotate=False, exhaustive=not cascade)
+        if results is None:
+            raise RuntimeError(error)
+        return [(result['type'], result['data']) for result in results]
+    return scan
+
+
+def desktop_pipeline():
+    from decoder import scan_frame
+
+    def scan(image):
+        return [(obj['type'], obj['data']) for obj in scan_frame(image)]
+    return scan
+
+
+def load_pipeline(name):
+    if name == 'web':
+        return web_pipeline(cascade=False)
+    if name == 'web-cascade':
+        return web_pipeline(cascade=True)
+    return desktop_pipeline()
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def score(truth, found):
+    """(true positives, false positives) of decoded payloads against the ground truth"""
+    expected = {(item['type'], item['data']) for item in truth}
+    decoded = {(TYPE_NAMES.get(kind, kind.lower()), data) for kind, data in found}
+    return len(expected & decoded), len(decoded - expected)
+
+
+def run_pipeline(scan, corpus, warmup, memory_images):
+    for _, image, _ in corpus[:warmup]:
+        scan(image)
+
+    latencies = []
+    cases = {}
+    for name, image, truth in corpus:
+        start = time.perf_counter()
+        found = scan(image)
+        latencies.append(time.perf_counter() - start)
+        hits, false_positives = score(truth, found)
+        case = cases.setdefault(name, {'expected': 0, 'decoded': 0, 'false_positives': 0})
+        case['expected'] += len(truth)
+        case['decoded'] += hits
+        case['false_positives'] += false_positives
+
+    # Memory is traced in a separate pass so tracing doesn't skew the latencies
+    tracemalloc.start()
+    for _, image, _ in corpus[:memory_images]:
+        scan(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    expected = sum(case['expected'] for case in cases.values())
+    decoded = sum(case['decoded'] for case in cases.values())
+    false_positives = sum(case['false_positives'] for case in cases.values())
+    total = sum(latencies)
+    return {
+        'images': len(corpus),
+        'images_per_second': len(corpus) / total if total else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_traced_mb': peak / (1024 * 1024),
+        'recall': decoded / expected if expected else 1.0,
+        'precision': decoded / (decoded + false_positives) if decoded + false_positives else 1.0,
+        'cases': {
+            name: {'recall': case['decoded'] / case['expected'] if case['expected'] else 1.0,
+                   'false_positives': case['false_positives']}
+            for name, case in sorted(cases.items())
+        },
+    }
+
+
+def compare(report, baseline, recall_tolerance, latency_tolerance):
+    """Return human-readable regressions of report against baseline"""
+    if report['corpus'] != baseline.get('corpus'):
+        print("Warning: corpus settings differ from the baseline", file=sys.stderr)
+    regressions = []
+    for name, result in report['pipelines'].items():
+        reference = baseline['pipelines'].get(name)
+        if reference is None:
+            continue
+        if result['recall'] < reference['recall'] - recall_tolerance:
+            regressions.append(f"{name}: recall {reference['recall']:.3f} -> {result['recall']:.3f}")
+        for case, values in result['cases'].items():
+            reference_case = reference['cases'].get(case)
+            if reference_case and values['recall'] < reference_case['recall'] - recall_tolerance:
+                regressions.append(f"{name} {case}: recall {reference_case['recall']:.3f} -> {values['recall']:.3f}")
+        if result['p95_ms'] > reference['p95_ms'] * (1 + latency_tolerance):
+            regressions.append(f"{name}: p95 {reference['p95_ms']:.1f} ms -> {result['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pipelines', nargs='+', default=list(PIPELINES), choices=PIPELINES)
+    parser.add_argument('--corpus', help='Directory written by synthetic.py (default: generate in memory)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--images-per-case', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--memory-images', type=int, default=10, help='Images in the memory tracing pass')
+    parser.add_argument('--save-baseline', help='Write the report to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check the report against')
+    parser.add_argument('--recall-tolerance', type=float, default=0.02, help='Allowed absolute recall drop')
+    parser.add_argument('--latency-tolerance', type=float, default=0.25, help='Allowed relative p95 increase')
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = list(load_corpus(args.corpus))
+        corpus_settings = {'directory': args.corpus}
+    else:
+        corpus = list(generate_corpus(args.seed, args.images_per_case))
+        corpus_settings = {'seed': args.seed, 'images_per_case': args.images_per_case}
+
+    report = {
+        'corpus': corpus_settings,
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'pipelines': {},
+    }
+    for name in args.pipelines:
+        try:
+            scan = load_pipeline(name)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            continue
+        report['pipelines'][name] = run_pipeline(scan, corpus, args.warmup, args.memory_images)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report['peak_rss_mb'] = maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+    print(f"{len(corpus)} images, peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"{'pipeline':<14}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mem MB':>8}{'recall':>8}{'prec':>7}")
+    for name, row in report['pipelines'].items():
+        print(f"{name:<14}{row['images_per_second']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['peak_traced_mb']:>8.1f}{row['recall']:>8.3f}{row['precision']:>7.3f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.recall_tolerance, args.latency_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Generate synthetic QR / Data Matrix test images with known contents.
+
+Every image is built from a seeded random generator, so the same seed always
+gives the same corpus. Cases vary one factor at a time around a base scene
+(code count, module size, resolution, rotation, blur and noise) for both
+symbologies. QR codes are encoded with qrcode, Data Matrix with pylibdmtx.
+
+    python benchmarks/synthetic.py corpus/ --images-per-case 5
+
+writes PNGs plus a manifest.jsonl with each image's case and ground truth.
+"""
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+SYMBOLOGIES = ('qr-code', 'data-matrix')
+
+BASE_CASE = {'count': 1, 'module': 6, 'resolution': (1280, 720), 'rotation': 0, 'blur': 0.0, 'noise': 0.0}
+
+# Values tried for each factor while the others keep their BASE_CASE value
+VARIATIONS = {
+    'count': (1, 4, 12),
+    'module': (3, 6, 10),
+    'resolution': ((640, 480), (1280, 720), (1920, 1080), (3840, 2160)),
+    'rotation': (0, 15, 45),
+    'blur': (0.0, 1.0, 2.0),
+    'noise': (0.0, 8.0, 16.0),
+}
+
+QUIET_ZONE = 4  # Modules of white border around each code
+
+
+def case_name(symbology, factor, params):
+    value = params[factor]
+    if factor == 'resolution':
+        value = f"{value[0]}x{value[1]}"
+    return f"{symbology}/{factor}={value}"
+
+
+def iter_cases():
+    """Yield (name, symbology, params) for every case, skipping repeats of the base case"""
+    for symbology in SYMBOLOGIES:
+        seen = set()
+        for factor, values in VARIATIONS.items():
+            for value in values:
+                params = dict(BASE_CASE, **{factor: value})
+                key = tuple(sorted(params.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                name = case_name(symbology, factor, params) if value != BASE_CASE[factor] else f"{symbology}/base"
+                yield name, symbology, params
+
+
+def encode_qrcode(data, module):
+    import qrcode
+    code = qrcode.QRCode(box_size=module, border=QUIET_ZONE, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    code.add_data(data)
+    code.make(fit=True)
+    image = np.array(code.make_image(fill_color='black', back_color='white').convert('L'))
+    return image
+
+
+def encode_datamatrix(data, module):
+    from pylibdmtx import pylibdmtx
+    # libdmtx always draws 5 px modules with a 2 module margin
+    encoded = pylibdmtx.encode(data.encode('utf-8'))
+    image = np.frombuffer(encoded.pixels, dtype=np.uint8).reshape(encoded.height, encoded.width, encoded.bpp // 8)
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    gray = cv2.resize(gray, None, fx=module / 5, fy=module / 5, interpolation=cv2.INTER_NEAREST)
+    pad = (QUIET_ZONE - 2) * module
+    return cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+
+
+ENCODERS = {'qr-code': encode_qrcode, 'data-matrix': encode_datamatrix}
+
+
+def rotate_code(code, angle):
+    """Rotate a grayscale code image, growing the canvas so no corner is cut off"""
+    if angle == 0:
+        return code, np.full(code.shape, 255, np.uint8)
+    height, width = code.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width, new_height = int(height * sin + width * cos), int(height * cos + width * sin)
+    matrix[0, 2] += new_width / 2 - width / 2
+    matrix[1, 2] += new_height / 2 - height / 2
+    rotated = cv2.warpAffine(code, matrix, (new_width, new_height), flags=cv2.INTER_LINEAR, borderValue=255)
+    mask = cv2.warpAffine(np.full(code.shape, 255, np.uint8), matrix, (new_width, new_height), flags=cv2.INTER_NEAREST)
+    return rotated, mask
+
+
+def make_background(rng, width, height):
+    """Smooth coloured clutter so the detector sees something besides the codes"""
+    small = rng.integers(90, 200, size=(max(height // 40, 2), max(width // 40, 2), 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def make_image(rng, symbology, params):
+    """Render one scene, returning (BGR image, ground truth list)"""
+    width, height = params['resolution']
+    image = make_background(rng, width, height)
+    count = params['count']
+    columns = int(np.ceil(np.sqrt(count * width / height)))
+    rows = int(np.ceil(count / columns))
+    cell_width, cell_height = width // columns, height // rows
+
+    truth = []
+    for index in range(count):
+        data = f"{symbology}-{rng.integers(1 << 40):010x}-{index}"
+        code, mask = rotate_code(ENCODERS[symbology](data, params['module']), params['rotation'])
+        code_height, code_width = code.shape
+        if code_width > cell_width or code_height > cell_height:
+            # Too big for its grid cell at this resolution; leave it out of the scene and the truth
+            continue
+        row, column = divmod(index, columns)
+        x = column * cell_width + int(rng.integers(0, cell_width - code_width + 1))
+        y = row * cell_height + int(rng.integers(0, cell_height - code_height + 1))
+        region = image[y:y + code_height, x:x + code_width]
+        region[mask > 0] = cv2.cvtColor(code, cv2.COLOR_GRAY2BGR)[mask > 0]
+        truth.append({'type': symbology, 'data': data, 'box': [x, y, x + code_width, y + code_height]})
+
+    if params['blur'] > 0:
+        image = cv2.GaussianBlur(image, (0, 0), params['blur'])
+    if params['noise'] > 0:
+        noise = rng.normal(0, params['noise'], image.shape)
+        image = np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return image, truth
+
+
+def generate_corpus(seed=0, images_per_case=3, symbologies=SYMBOLOGIES):
+    """Yield (case_name, image, truth) for every case, images_per_case times each"""
+    rng = np.random.default_rng(seed)
+    for name, symbology, params in iter_cases():
+        if symbology not in symbologies:
+            continue
+        for _ in range(images_per_case):
+            image, truth = make_image(rng, symbology, params)
+            yield name, image, truth
+
+
+def load_corpus(directory):
+    """Read a corpus written by this script back as (case_name, image, truth) tuples"""
+    with open(os.path.join(directory, 'manifest.jsonl')) as f:
+        for line in f:
+            entry = json.loads(line)
+            image = cv2.imread(os.path.join(directory, entry['file']))
+            yield entry['case'], image, entry['truth']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help='Directory to write images and manifest.jsonl to')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--images-per-case', type=int, default=3)
+    parser.add_argument('--symbologies', nargs='+', default=list(SYMBOLOGIES), choices=SYMBOLOGIES)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    count = 0
+    with open(os.path.join(args.output, 'manifest.jsonl'), 'w') as manifest:
+        for index, (name, image, truth) in enumerate(generate_corpus(args.seed, args.images_per_case,
+                                                                     args.symbologies)):
+            filename = f"{index:05d}.png"
+            cv2.imwrite(os.path.join(args.output, filename), image)
+            manifest.write(json.dumps({'file': filename, 'case': name, 'truth': truth}) + '\n')
+            count += 1
+    print(f"Wrote {count} images to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,615 @@
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QLabel, QPushButton, QTextEdit, QComboBox, QScrollArea, 
-                            QFileDialog, QMessageBox, QStatusBar, QFrame)
-from PyQt5.QtGui import QImage, QPixmap, QTextCursor, QFont, QTextCharFormat, QColor
-from PyQt5.QtCore import Qt, QTimer, QDateTime, pyqtSignal, QThread
+                            QLabel, QPushButton, QComboBox, QScrollArea, QTableView, QHeaderView,
+                            QFileDialog, QMessageBox, QStatusBar, QFrame, QCheckBox, QSpinBox)
+from PyQt5.QtGui import QImage, QPixmap, QFont, QColor
+from PyQt5.QtCore import (Qt, QTimer, QDateTime, pyqtSignal, QObject, QThread, QMutex, QWaitCondition,
+                          QAbstractTableModel, QModelIndex)
 from PyQt5.QtMultimedia import QCameraInfo, QCamera
 from PyQt5.QtMultimediaWidgets import QCameraViewfinder
 import cv2
-from pyzbar.pyzbar import decode
 import numpy as np
 import webbrowser
 from datetime import datetime
 import pyperclip
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from scan_history import ScanHistory, ScanHistoryError
+from scanner_core import DEFAULT_SYMBOLOGIES, SYMBOLOGIES, Scanner, parse_symbologies
+from video_scan import VIDEO_EXTENSIONS, VideoReader
+
+# Set SCANNER_LEGACY_RENDER=1 to render live frames the old way (full-res copy,
+# rgbSwapped, smooth QPixmap scaling) when comparing render cost
+LEGACY_RENDER = os.environ.get('SCANNER_LEGACY_RENDER', '0') == '1'
+
+# Symbologies to look for (e.g. SCANNER_SYMBOLOGIES=qr-code to skip libdmtx) and the
+# libdmtx time allowed per full-frame or ROI decode
+SCANNER_SYMBOLOGIES = parse_symbologies(os.environ.get('SCANNER_SYMBOLOGIES', ','.join(DEFAULT_SYMBOLOGIES)))
+SCANNER_DATAMATRIX_BUDGET_MS = int(os.environ.get('SCANNER_DATAMATRIX_BUDGET_MS', '100'))
+scanner = Scanner(SCANNER_SYMBOLOGIES, datamatrix_budget_ms=SCANNER_DATAMATRIX_BUDGET_MS)
+
+def scan_frame(image):
+    """Find codes of the enabled symbologies in a whole frame or photo without drawing.
+
+    Safe to call from worker threads; the GUI and the benchmarks both use it.
+    """
+    return scanner.decode(image, full_frame=True)
+
+# Multi-camera mode: cameras started at once, and decode threads they share
+# (0 means one per camera, up to the number of cores)
+MULTI_CAMERA_MAX = int(os.environ.get('SCANNER_MULTI_CAMERA_MAX', '4'))
+MULTI_CAMERA_DECODE_WORKERS = int(os.environ.get('SCANNER_DECODE_WORKERS', '0'))
+
+# Scan history: the SQLite file, how many scans it keeps, and how many of the newest the list shows
+HISTORY_DB = os.environ.get('SCANNER_HISTORY_DB', 'scan_history.db')
+HISTORY_MAX_ROWS = int(os.environ.get('SCANNER_HISTORY_MAX_ROWS', '5000000'))
+HISTORY_VIEW_ROWS = int(os.environ.get('SCANNER_HISTORY_VIEW_ROWS', '10000'))
+
+class FpsCounter:
+    """Frames per second over a sliding one-second window"""
+    
+    def __init__(self):
+        self.timestamps = deque()
+        
+    def tick(self):
+        now = time.monotonic()
+        self.timestamps.append(now)
+        while self.timestamps and self.timestamps[0] < now - 1.0:
+            self.timestamps.popleft()
+            
+    @property
+    def fps(self):
+        now = time.monotonic()
+        return sum(1 for t in self.timestamps if t >= now - 1.0)
 
 class CameraThread(QThread):
-    frame_ready = pyqtSignal(np.ndarray)
+    """Captures frames, hands them to listeners and keeps the newest one for display"""
     
     def __init__(self, camera_index):
         super().__init__()
         self.camera_index = camera_index
         self.running = True
+        self.frame_listeners = []
+        self.latest_frame = None
+        self.frame_seq = 0
         
     def run(self):
         cap = cv2.VideoCapture(self.camera_index)
         while self.running:
             ret, frame = cap.read()
             if ret:
-                self.frame_ready.emit(frame)
+                # Listeners (the decode worker) run on this thread and must not block
+                for listener in self.frame_listeners:
+                    listener(frame)
+                # The GUI polls this at the display refresh rate; a single
+                # reference assignment, so no lock is needed
+                self.frame_seq += 1
+                self.latest_frame = (self.frame_seq, frame)
         cap.release()
         
     def stop(self):
         self.running = False
         self.wait()
 
+class DecodeWorker(QThread):
+    """Decodes camera frames off the GUI thread, always working on the newest frame.
+
+    submit() only replaces a single pending slot, so frames that arrive while a
+    decode is running are dropped instead of queuing up. A decode error is
+    reported through decode_failed once, not again for every frame it repeats on.
+    """
+    results_ready = pyqtSignal(object)
+    decode_failed = pyqtSignal(str)
+    
+    def __init__(self, scan_fn):
+        super().__init__()
+        self.scan_fn = scan_fn
+        self.running = True
+        self.pending_frame = None
+        self.mutex = QMutex()
+        self.frame_available = QWaitCondition()
+        self.fps = FpsCounter()
+        self.dropped_frames = 0
+        self.last_error = None
+        
+    def submit(self, frame):
+        self.mutex.lock()
+        if self.pending_frame is not None:
+            self.dropped_frames += 1
+        self.pending_frame = frame
+        self.frame_available.wakeOne()
+        self.mutex.unlock()
+        
+    def run(self):
+        while True:
+            self.mutex.lock()
+            while self.running and self.pending_frame is None:
+                self.frame_available.wait(self.mutex)
+            frame = self.pending_frame
+            self.pending_frame = None
+            running = self.running
+            self.mutex.unlock()
+            if not running:
+                break
+            
+            try:
+                results = self.scan_fn(frame)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if error != self.last_error:
+                    self.last_error = error
+                    self.decode_failed.emit(error)
+                continue
+            self.last_error = None
+            self.fps.tick()
+            self.results_ready.emit(results)
+            
+    def stop(self):
+        self.mutex.lock()
+        self.running = False
+        self.frame_available.wakeOne()
+        self.mutex.unlock()
+        self.wait()
+
+class CameraDecodeStats:
+    """Decode rate, dropped frames and capture-to-result latency of one camera"""
+    
+    def __init__(self):
+        self.fps = FpsCounter()
+        self.dropped_frames = 0
+        self.latency_ms = 0.0
+        self.last_error = None
+        
+    def record(self, latency_ms):
+        self.fps.tick()
+        # Exponential moving average, seeded with the first sample
+        self.latency_ms = latency_ms if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * latency_ms
+
+class PoolThread(QThread):
+    """A QThread that runs one function"""
+    
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        
+    def run(self):
+        self.target()
+
+class DecodePool(QObject):
+    """Decodes frames from several cameras on a fixed set of shared worker threads.
+
+    Like DecodeWorker, every camera has a single pending slot, so frames that
+    arrive while that camera is being decoded replace each other instead of
+    queuing. A camera is never decoded by two workers at once, which keeps its
+    scan function (e.g. its own CodeTracker) single-threaded, and a free worker
+    takes the camera whose frame has waited longest so cameras share the
+    workers fairly. CPU use is bounded by the worker count, however many
+    cameras there are. Decode errors are reported like DecodeWorker's, once
+    per camera until it decodes a frame again.
+    """
+    results_ready = pyqtSignal(object, object)
+    decode_failed = pyqtSignal(object, str)
+    
+    def __init__(self, scan_fns, workers):
+        super().__init__()
+        self.scan_fns = scan_fns  # camera index -> scan function
+        self.running = True
+        self.pending = {}  # camera index -> (waiting since, capture time, frame)
+        self.busy = set()
+        self.mutex = QMutex()
+        self.frame_available = QWaitCondition()
+        self.stats = {camera: CameraDecodeStats() for camera in scan_fns}
+        self.threads = [PoolThread(self.work) for _ in range(max(workers, 1))]
+        
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        
+    def submit(self, camera, frame):
+        now = time.monotonic()
+        self.mutex.lock()
+        waiting_since = now
+        if camera in self.pending:
+            # Replace the unprocessed frame but keep the camera's place in line
+            self.stats[camera].dropped_frames += 1
+            waiting_since = self.pending[camera][0]
+        self.pending[camera] = (waiting_since, now, frame)
+        self.frame_available.wakeOne()
+        self.mutex.unlock()
+        
+    def next_frame(self):
+        """Wait for a frame of a camera no other worker is decoding; None once stopped"""
+        self.mutex.lock()
+        try:
+            while True:
+                if not self.running:
+                    return None
+                ready = [camera for camera in self.pending if camera not in self.busy]
+                if ready:
+                    camera = min(ready, key=lambda c: self.pending[c][0])
+                    _, captured, frame = self.pending.pop(camera)
+                    self.busy.add(camera)
+                    return camera, captured, frame
+                self.frame_available.wait(self.mutex)
+        finally:
+            self.mutex.unlock()
+        
+    def work(self):
+        while True:
+            job = self.next_frame()
+            if job is None:
+                return
+            camera, captured, frame = job
+            error = None
+            try:
+                results = self.scan_fns[camera](frame)
+            except Exception as e:
+                results = None
+                error = f"{type(e).__name__}: {e}"
+            
+            self.mutex.lock()
+            self.busy.discard(camera)
+            stats = self.stats[camera]
+            if results is not None:
+                stats.record((time.monotonic() - captured) * 1000)
+            # Only the first of a run of identical errors is reported
+            report_error = error is not None and error != stats.last_error
+            stats.last_error = error
+            if camera in self.pending:
+                # A newer frame of this camera arrived while it was busy
+                self.frame_available.wakeOne()
+            self.mutex.unlock()
+            if results is not None:
+                self.results_ready.emit(camera, results)
+            if report_error:
+                self.decode_failed.emit(camera, error)
+            
+    def camera_stats(self):
+        """(decode FPS, dropped frames, latency ms) of each camera"""
+        self.mutex.lock()
+        try:
+            return {camera: (stats.fps.fps, stats.dropped_frames, stats.latency_ms)
+                    for camera, stats in self.stats.items()}
+        finally:
+            self.mutex.unlock()
+            
+    def stop(self):
+        self.mutex.lock()
+        self.running = False
+        self.frame_available.wakeAll()
+        self.mutex.unlock()
+        for thread in self.threads:
+            thread.wait()
+
+class CodeTracker:
+    """Follows decoded codes across live frames so most frames only decode a small ROI.
+
+    A full-frame scan runs when nothing is tracked, every rescan_interval
+    frames, or once a track has missed max_misses frames in a row. In between,
+    each track's box is shifted by the motion that phase correlation measures
+    on a downscaled copy of the frame, and only a padded region around it is
+    decoded. decode_fn is called like Scanner.decode, with full_frame=True for
+    full-frame scans.
+    """
+    
+    def __init__(self, decode_fn, rescan_interval=15, padding=0.5, max_misses=2, motion_scale=4):
+        self.decode_fn = decode_fn
+        self.rescan_interval = rescan_interval
+        self.padding = padding
+        self.max_misses = max_misses
+        self.motion_scale = motion_scale
+        self.tracks = []  # {'box': [x1, y1, x2, y2], 'misses': int}
+        self.prev_small = None
+        self.frames_since_full = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+        
+    @staticmethod
+    def bounding_box(obj):
+        rect = obj['rect']
+        xs = [p[0] for p in obj['points']] or [rect['left'], rect['left'] + rect['width']]
+        ys = [p[1] for p in obj['points']] or [rect['top'], rect['top'] + rect['height']]
+        return [min(xs), min(ys), max(xs), max(ys)]
+    
+    @staticmethod
+    def translate(obj, dx, dy):
+        """Move a decoded code from ROI coordinates into frame coordinates"""
+        return dict(
+            obj,
+            rect=dict(obj['rect'], left=obj['rect']['left'] + dx, top=obj['rect']['top'] + dy),
+            points=[(x + dx, y + dy) for x, y in obj['points']]
+        )
+        
+    def estimate_motion(self, small, box):
+        """Shift of the area around box between the previous and current frame, in full-res pixels"""
+        if self.prev_small is None:
+            return 0, 0
+        s = self.motion_scale
+        height, width = small.shape[:2]
+        margin_x = (box[2] - box[0]) // s
+        margin_y = (box[3] - box[1]) // s
+        x1 = max(box[0] // s - margin_x, 0)
+        y1 = max(box[1] // s - margin_y, 0)
+        x2 = min(box[2] // s + margin_x, width)
+        y2 = min(box[3] // s + margin_y, height)
+        if x2 - x1 < 16 or y2 - y1 < 16:
+            return 0, 0
+        
+        window = cv2.createHanningWindow((x2 - x1, y2 - y1), cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(self.prev_small[y1:y2, x1:x2], small[y1:y2, x1:x2], window)
+        if response < 0.05:
+            return 0, 0
+        return int(round(dx * s)), int(round(dy * s))
+        
+    def full_scan(self, gray):
+        results = self.decode_fn(gray, full_frame=True)
+        self.full_scans += 1
+        self.frames_since_full = 0
+        self.tracks = [{'box': self.bounding_box(obj), 'misses': 0} for obj in results]
+        return results
+        
+    def scan(self, frame):
+        """Decode a BGR frame, returning decoded codes in frame coordinates"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        s = self.motion_scale
+        small = cv2.resize(gray, (gray.shape[1] // s, gray.shape[0] // s),
+                           interpolation=cv2.INTER_AREA).astype(np.float32)
+        
+        if not self.tracks or self.frames_since_full >= self.rescan_interval:
+            results = self.full_scan(gray)
+            self.prev_small = small
+            return results
+        
+        self.frames_since_full += 1
+        height, width = gray.shape[:2]
+        results = []
+        seen = set()
+        lost = False
+        for track in self.tracks:
+            dx, dy = self.estimate_motion(small, track['box'])
+            x1, y1, x2, y2 = track['box']
+            x1, y1, x2, y2 = x1 + dx, y1 + dy, x2 + dx, y2 + dy
+            pad_x = int((x2 - x1) * self.padding) + 8
+            pad_y = int((y2 - y1) * self.padding) + 8
+            rx1, ry1 = max(x1 - pad_x, 0), max(y1 - pad_y, 0)
+            rx2, ry2 = min(x2 + pad_x, width), min(y2 + pad_y, height)
+            track['box'] = [x1, y1, x2, y2]
+            if rx2 - rx1 < 8 or ry2 - ry1 < 8:
+                lost = True
+                continue
+            
+            found = self.decode_fn(gray[ry1:ry2, rx1:rx2])
+            self.roi_scans += 1
+            if not found:
+                track['misses'] += 1
+                lost = lost or track['misses'] > self.max_misses
+                continue
+            
+            track['misses'] = 0
+            found = [self.translate(obj, rx1, ry1) for obj in found]
+            track['box'] = self.bounding_box(found[0])
+            for obj in found:
+                if (obj['type'], obj['data']) in seen:
+                    continue
+                seen.add((obj['type'], obj['data']))
+                results.append(obj)
+        
+        if lost:
+            results = self.full_scan(gray)
+        self.prev_small = small
+        return results
+        
+    @property
+    def roi_ratio(self):
+        """Share of decode calls that only looked at a tracked region"""
+        total = self.full_scans + self.roi_scans
+        return self.roi_scans / total if total else 0.0
+
+class ScanDeduplicator:
+    """Turns per-frame detections into scan events, keyed by (symbology, payload).
+
+    A payload produces an event the first time it is seen and again only after
+    it has been out of view for ttl seconds; every sighting refreshes it.
+    """
+    
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self.last_seen = {}
+        self.raw_detections = 0
+        
+    def filter(self, decoded_objects):
+        """Return the objects that count as new scans"""
+        now = time.monotonic()
+        new = []
+        for obj in decoded_objects:
+            key = (obj['type'], obj['data'])
+            self.raw_detections += 1
+            last = self.last_seen.get(key)
+            if last is None or now - last > self.ttl:
+                new.append(obj)
+            self.last_seen[key] = now
+        
+        # Forget expired payloads so the table doesn't grow over long sessions
+        if len(self.last_seen) > 1024:
+            self.last_seen = {k: t for k, t in self.last_seen.items() if now - t <= self.ttl}
+        return new
+        
+    def reset(self):
+        self.last_seen.clear()
+
+class ScanHistoryModel(QAbstractTableModel):
+    """The newest max_rows scans of a ScanHistory, newest first, for a QTableView.
+
+    Rows are read from the history only when the view asks for them, a page
+    of ids at a time with the last few pages cached, so the list stays fast
+    however many scans are stored. Scans the writer hasn't committed yet sit
+    above the written ones, from the snapshot of the last refresh. refresh()
+    adds new scans at the top and drops rows past max_rows.
+    """
+    HEADERS = ('Time', 'Source', 'Type', 'Data')
+    PAGE_ROWS = 256
+    CACHED_PAGES = 16
+    
+    def __init__(self, history, max_rows):
+        super().__init__()
+        self.history = history
+        self.max_rows = max_rows
+        self.top_id, self.pending = history.snapshot()
+        self.count = min(history.count(), max_rows)
+        self.pages = OrderedDict()  # page number (id // PAGE_ROWS) -> {id: row}
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def scan(self, row):
+        """The history row shown at a view row, or None if it has been trimmed"""
+        if row < len(self.pending):
+            return self.pending[-1 - row]
+        row_id = self.top_id - (row - len(self.pending))
+        page_number = row_id // self.PAGE_ROWS
+        page = self.pages.get(page_number)
+        if page is None:
+            first_id = page_number * self.PAGE_ROWS
+            page = {scan[0]: scan for scan in self.history.rows(first_id, first_id + self.PAGE_ROWS - 1)}
+            self.pages[page_number] = page
+            if len(self.pages) > self.CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_number)
+        return page.get(row_id)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if role not in (Qt.DisplayRole, Qt.ForegroundRole) or not index.isValid():
+            return None
+        scan = self.scan(index.row())
+        if scan is None:
+            return None
+        _, timestamp, symbology, payload, source, _ = scan
+        if role == Qt.ForegroundRole:
+            return QColor("#1e90ff") if payload.lower().startswith(("http://", "https://")) else None
+        column = index.column()
+        if column == 0:
+            return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return (source, symbology, payload)[column - 1]
+    
+    def row_text(self, row):
+        scan = self.scan(row)
+        if scan is None:
+            return ""
+        _, timestamp, symbology, payload, source, _ = scan
+        return f"[{datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')}] [{source}] {symbology}: {payload}"
+    
+    def refresh(self):
+        """Show scans added to the history since the last refresh"""
+        top_id, pending = self.history.snapshot()
+        if top_id == self.top_id and pending == self.pending:
+            return
+        added = (top_id + len(pending)) - (self.top_id + len(self.pending))
+        previously_pending = len(self.pending)
+        # The newest page may have been cached before it filled up
+        self.pages.pop(self.top_id // self.PAGE_ROWS, None)
+        if added > 0:
+            self.beginInsertRows(QModelIndex(), 0, added - 1)
+            self.top_id, self.pending = top_id, pending
+            self.count += added
+            self.endInsertRows()
+        else:
+            self.top_id, self.pending = top_id, pending
+        # Scans that were pending are now read from the database
+        changed = min(self.count, previously_pending + max(added, 0))
+        if changed:
+            self.dataChanged.emit(self.index(0, 0), self.index(changed - 1, len(self.HEADERS) - 1))
+        if self.count > self.max_rows:
+            self.beginRemoveRows(QModelIndex(), self.max_rows, self.count - 1)
+            self.count = self.max_rows
+            self.endRemoveRows()
+    
+    def clear(self):
+        """Empty the list; the scans stay in the history and its exports"""
+        self.beginResetModel()
+        self.top_id, self.pending = self.history.snapshot()
+        self.top_id += len(self.pending)
+        self.pending = ()
+        self.count = 0
+        self.pages.clear()
+        self.endResetModel()
+
+class ExportThread(QThread):
+    """Streams the scan history to a file off the GUI thread"""
+    export_finished = pyqtSignal(str, int, str)  # path, rows written, error message
+    
+    def __init__(self, history, path):
+        super().__init__()
+        self.history = history
+        self.path = path
+        
+    def run(self):
+        try:
+            self.export_finished.emit(self.path, self.history.export_to_path(self.path), "")
+        except Exception as e:
+            self.export_finished.emit(self.path, 0, str(e))
+
+class VideoScanThread(QThread):
+    """Scans a video file frame by frame, skipping near-duplicate frames.
+
+    Like the cameras, nothing is queued for the GUI per frame: the newest
+    scanned frame is kept in latest_frame for the display timer, and payloads
+    not seen before in this video collect until take_scans() picks them up.
+    """
+    scan_finished = pyqtSignal(dict)
+    
+    def __init__(self, path, scan_fn):
+        super().__init__()
+        self.path = path
+        self.scan_fn = scan_fn
+        self.running = True
+        self.latest_frame = None  # (seq, frame, decoded objects)
+        self.frame_seq = 0
+        # Report each payload once per video
+        self.deduplicator = ScanDeduplicator(ttl=float('inf'))
+        self.new_scans = []  # (timestamp, decoded objects) not taken yet
+        self.scans_lock = threading.Lock()
+        
+    def run(self):
+        try:
+            reader = VideoReader(self.path)
+        except ValueError:
+            self.scan_finished.emit({})
+            return
+        try:
+            for _, timestamp, frame in reader:
+                if not self.running:
+                    break
+                decoded_objects = self.scan_fn(frame)
+                new = self.deduplicator.filter(decoded_objects)
+                if new:
+                    with self.scans_lock:
+                        self.new_scans.append((timestamp, new))
+                self.frame_seq += 1
+                self.latest_frame = (self.frame_seq, frame, decoded_objects)
+        finally:
+            reader.close()
+            self.scan_finished.emit(reader.stats())
+            
+    def take_scans(self):
+        with self.scans_lock:
+            scans, self.new_scans = self.new_scans, []
+        return scans
+            
+    def stop(self):
+        self.running = False
+        self.wait()
+
 class CodeScannerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -56,9 +633,45 @@ class CodeScannerApp(QMainWindow):
         
         # Initialize variables
         self.camera_thread = None
-        self.scan_count = 0
+        self.decode_worker = None
+        self.tracker = None
+        # Multi-camera mode: one capture thread per camera feeding a shared decode pool
+        self.camera_threads = {}
+        self.decode_pool = None
+        self.trackers = {}
+        self.camera_frames = {}
+        self.camera_results = {}
+        self.rendered_seqs = {}
+        self.tile_canvas = None
+        self.video_thread = None
+        self.live_results = []
+        self.deduplicator = ScanDeduplicator()
+        self.display_fps = FpsCounter()
+        self.history = ScanHistory(HISTORY_DB, max_rows=HISTORY_MAX_ROWS)
+        self.session_scans = 0
+        self.history_error_shown = False
+        self.export_thread = None
+        self.live_source = None
+        self.video_source = None
         self.last_scan_time = None
         
+        # Refresh live FPS in the status bar
+        self.fps_timer = QTimer(self)
+        self.fps_timer.timeout.connect(self.update_fps_status)
+        
+        # Render live frames at most once per display refresh
+        self.render_timer = QTimer(self)
+        self.render_timer.setTimerType(Qt.PreciseTimer)
+        self.render_timer.timeout.connect(self.render_latest_frame)
+        self.rendered_seq = 0
+        # Video scans are shown the same way, from the scan thread's newest frame
+        self.video_timer = QTimer(self)
+        self.video_timer.setTimerType(Qt.PreciseTimer)
+        self.video_timer.timeout.connect(self.render_video)
+        self.rendered_video_seq = 0
+        self.rgb_buffer = None
+        self.render_cpu_ms = 0.0
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -99,7 +712,7 @@ class CodeScannerApp(QMainWindow):
         # Control buttons
         btn_layout = QHBoxLayout()
         
-        self.load_btn = QPushButton("📁 Load Image")
+        self.load_btn = QPushButton("📁 Load Image / Video")
         self.load_btn.setStyleSheet(self.get_button_style())
         self.load_btn.clicked.connect(self.load_image)
         btn_layout.addWidget(self.load_btn)
@@ -157,6 +770,11 @@ class CodeScannerApp(QMainWindow):
         self.refresh_cam_btn.clicked.connect(self.detect_cameras)
         cam_layout.addWidget(self.refresh_cam_btn)
         
+        self.multi_check = QCheckBox("All cameras")
+        self.multi_check.setToolTip(f"Scan up to {MULTI_CAMERA_MAX} cameras at once, with a tiled preview "
+                                    "and one merged result list")
+        cam_layout.addWidget(self.multi_check)
+        
         live_layout.addLayout(cam_layout)
         
         # Camera controls
@@ -173,6 +791,20 @@ class CodeScannerApp(QMainWindow):
         self.stop_btn.setEnabled(False)
         cam_btn_layout.addWidget(self.stop_btn)
         
+        self.track_check = QCheckBox("Track codes")
+        self.track_check.setToolTip("Decode only around codes already found; rescan the full frame periodically")
+        self.track_check.setChecked(True)
+        cam_btn_layout.addWidget(self.track_check)
+        
+        cam_btn_layout.addWidget(QLabel("Repeat after:"))
+        self.dedup_spin = QSpinBox()
+        self.dedup_spin.setRange(0, 3600)
+        self.dedup_spin.setValue(5)
+        self.dedup_spin.setSuffix(" s")
+        self.dedup_spin.setToolTip("A code held in view is only recorded again after it has been gone this long")
+        self.dedup_spin.valueChanged.connect(lambda value: setattr(self.deduplicator, 'ttl', value))
+        cam_btn_layout.addWidget(self.dedup_spin)
+        
         cam_btn_layout.addStretch()
         
         self.snapshot_btn = QPushButton("📸 Take Snapshot")
@@ -190,13 +822,16 @@ class CodeScannerApp(QMainWindow):
         result_frame.setStyleSheet(f"QFrame {{ border: 1px solid {self.secondary_color}; border-radius: 4px; }}")
         result_layout = QVBoxLayout(result_frame)
         
-        result_title = QLabel("🧾 Decoded Data")
+        result_title = QLabel("🧾 Scan History")
         result_title.setStyleSheet(f"font-size: 14px; font-weight: bold; color: {self.highlight_color};")
         result_layout.addWidget(result_title)
         
-        self.result_text = QTextEdit()
-        self.result_text.setStyleSheet(f"""
-            QTextEdit {{
+        # Only the visible rows are read from the history database
+        self.history_model = ScanHistoryModel(self.history, HISTORY_VIEW_ROWS)
+        self.history_view = QTableView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setStyleSheet(f"""
+            QTableView {{
                 background-color: {self.primary_color};
                 color: #00ff99;
                 border: 1px solid {self.secondary_color};
@@ -204,8 +839,21 @@ class CodeScannerApp(QMainWindow):
                 font-size: 11px;
             }}
         """)
-        self.result_text.setReadOnly(True)
-        result_layout.addWidget(self.result_text)
+        self.history_view.setSelectionBehavior(QTableView.SelectRows)
+        self.history_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.history_view.setWordWrap(False)
+        self.history_view.verticalHeader().hide()
+        self.history_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.history_view.verticalHeader().setDefaultSectionSize(20)
+        self.history_view.horizontalHeader().setStretchLastSection(True)
+        self.history_view.setToolTip("Double-click a URL to open it")
+        self.history_view.doubleClicked.connect(self.open_history_link)
+        result_layout.addWidget(self.history_view)
+        
+        # New scans are added to the list in batches rather than one signal each
+        self.history_timer = QTimer(self)
+        self.history_timer.timeout.connect(self.refresh_history)
+        self.history_timer.start(250)
         
         main_layout.addWidget(result_frame, 1)
         
@@ -257,56 +905,101 @@ class CodeScannerApp(QMainWindow):
         timestamp = QDateTime.currentDateTime().toString("HH:mm:ss")
         self.status_bar.showMessage(f"[{timestamp}] {message}")
         
+    def decode_failed(self, error, camera=None):
+        """Show a decode error of the live view in the status bar"""
+        if camera is not None:
+            self.update_status(f"Camera {camera}: decoding failed: {error}")
+        else:
+            self.update_status(f"Decoding failed: {error}")
+        
     def show_help(self):
         """Show help information"""
-        help_text = """QR & Data Matrix Scanner Help:
+        help_text = f"""QR & Data Matrix Scanner Help:
 
-1. Load Image: Open an image file containing QR/Data Matrix codes
+1. Load Image / Video: Open an image or video file containing QR/Data Matrix codes
 2. Live Detection: Use your camera to scan codes in real-time
 3. Export Results: Save decoded data to a text file
 4. Copy: Copy results to clipboard
 
-Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
+Enabled code types: {', '.join(scanner.symbologies)}
+Set SCANNER_SYMBOLOGIES to choose from: {', '.join(SYMBOLOGIES)}
 """
         QMessageBox.information(self, "Help", help_text)
         
     def show_stats(self):
         """Show scanning statistics"""
-        stats = f"Scan Statistics:\n\nTotal scans: {self.scan_count}"
+        stats = (f"Scan Statistics:\n\nScans this session: {self.session_scans}"
+                 f"\nScans in history: {self.history.count()}"
+                 f"\nRaw detections: {self.deduplicator.raw_detections}")
         if self.last_scan_time:
             stats += f"\nLast scan: {self.last_scan_time.strftime('%Y-%m-%d %H:%M:%S')}"
         QMessageBox.information(self, "Statistics", stats)
         
     def export_results(self):
-        """Export results to a text file"""
-        content = self.result_text.toPlainText()
-        if not content.strip():
+        """Export the whole scan history to CSV or JSON Lines, streamed in the background"""
+        if self.history.count() == 0:
             QMessageBox.warning(self, "Export", "No results to export!")
             return
+        if self.export_thread and self.export_thread.isRunning():
+            QMessageBox.warning(self, "Export", "An export is already running.")
+            return
             
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Export Results",
             "",
-            "Text files (*.txt);;All files (*)"
+            "CSV files (*.csv);;JSON Lines files (*.jsonl)"
         )
         
         if file_path:
-            try:
-                with open(file_path, "w") as f:
-                    f.write(content)
-                self.update_status(f"Results exported to {file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Export Error", f"Failed to export: {str(e)}")
+            if not os.path.splitext(file_path)[1]:
+                file_path += ".jsonl" if "jsonl" in selected_filter else ".csv"
+            self.export_thread = ExportThread(self.history, file_path)
+            self.export_thread.export_finished.connect(self.export_finished)
+            self.export_thread.start()
+            self.update_status(f"Exporting {self.history.count()} scans to {file_path}...")
+                
+    def export_finished(self, file_path, rows, error):
+        if error:
+            QMessageBox.critical(self, "Export Error", f"Failed to export: {error}")
+        else:
+            self.update_status(f"Exported {rows} scans to {file_path}")
                 
     def copy_to_clipboard(self):
-        """Copy results to clipboard"""
-        content = self.result_text.toPlainText()
+        """Copy the selected scans, or every scan in the list, to the clipboard"""
+        rows = sorted({index.row() for index in self.history_view.selectionModel().selectedRows()})
+        if not rows:
+            rows = range(self.history_model.rowCount())
+        content = "\n".join(self.history_model.row_text(row) for row in rows)
         if content.strip():
             pyperclip.copy(content)
             self.update_status("Results copied to clipboard")
         else:
             QMessageBox.warning(self, "Copy", "No results to copy!")
+    
+    def open_history_link(self, index):
+        scan = self.history_model.scan(index.row())
+        if scan and scan[3].lower().startswith(("http://", "https://")):
+            webbrowser.open(scan[3])
+    
+    def record_scans(self, decoded_objects, source):
+        """Add decoded codes to the scan history"""
+        try:
+            for obj in decoded_objects:
+                self.history.add(obj['type'], obj['data'], source, obj['points'])
+                self.session_scans += 1
+        except ScanHistoryError as e:
+            self.update_status(str(e))
+        if decoded_objects:
+            self.last_scan_time = datetime.now()
+
+    def refresh_history(self):
+        self.history_model.refresh()
+        if self.history.error is not None and not self.history_error_shown:
+            # Once: the writer has stopped and new scans won't be saved
+            self.history_error_shown = True
+            QMessageBox.critical(self, "Scan History Error",
+                                 f"Scans can no longer be saved to {HISTORY_DB}: {self.history.error}")
 
     def detect_cameras(self):
         """Detect available cameras"""
@@ -322,39 +1015,52 @@ Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
         else:
             self.update_status("No cameras detected!")
             
-    def decode_image(self, image):
-        """Decode QR/Data Matrix codes in the image"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        decoded_objects = decode(gray)
 
+    def draw_results(self, image, decoded_objects, scale=1.0):
+        """Draw decoded codes on the image and return their text labels.
+
+        scale maps frame coordinates onto the image, so overlays can be drawn
+        on an already downscaled display image.
+        """
         info = []
         for obj in decoded_objects:
             # Draw bounding box
-            points = obj.polygon
+            points = obj['points']
             if len(points) == 4:
-                pts = np.array(points, np.int32).reshape((-1, 1, 2))
+                pts = (np.array(points, np.float32) * scale).astype(np.int32).reshape((-1, 1, 2))
                 cv2.polylines(image, [pts], True, (0, 255, 0), 2)
 
-            data = obj.data.decode("utf-8")
-            label = f"{obj.type}: {data}"
+            label = f"{obj['type']}: {obj['data']}"
             info.append(label)
 
             # Draw code type label
-            cv2.putText(image, obj.type, (obj.rect.left, obj.rect.top - 10),
+            rect = obj['rect']
+            cv2.putText(image, obj['type'], (int(rect['left'] * scale), int(rect['top'] * scale) - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
 
-        return image, info
+        return info
+
+    def decode_image(self, image):
+        """Decode QR/Data Matrix codes in the image and draw them on it"""
+        decoded_objects = scan_frame(image)
+        self.draw_results(image, decoded_objects)
+        return image, decoded_objects
 
     def load_image(self):
-        """Load an image file for scanning"""
+        """Load an image or video file for scanning"""
+        video_patterns = " ".join(f"*.{ext}" for ext in sorted(VIDEO_EXTENSIONS))
         file_path, _ = QFileDialog.getOpenFileName(
             self,
-            "Open Image",
+            "Open Image or Video",
             "",
-            "Image files (*.png *.jpg *.jpeg *.bmp *.tiff);;All files (*)"
+            f"Image files (*.png *.jpg *.jpeg *.bmp *.tiff);;Video files ({video_patterns});;All files (*)"
         )
         if not file_path:
             return
+        
+        if file_path.rsplit('.', 1)[-1].lower() in VIDEO_EXTENSIONS:
+            self.load_video(file_path)
+            return
 
         try:
             image = cv2.imread(file_path)
@@ -363,17 +1069,62 @@ Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
                 return
 
             self.update_status(f"Processing {file_path}...")
-            image, decoded_info = self.decode_image(image)
+            image, decoded_objects = self.decode_image(image)
             self.show_image(image)
-            self.display_result(decoded_info)
-            self.scan_count += 1
-            self.last_scan_time = datetime.now()
-            self.update_status(f"Found {len(decoded_info)} code(s) in the image")
+            self.record_scans(decoded_objects, os.path.basename(file_path))
+            self.update_status(f"Found {len(decoded_objects)} code(s) in the image")
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to process image: {str(e)}")
             self.update_status("Image processing failed")
 
+    def load_video(self, file_path):
+        """Scan a video file in the background, streaming results as frames are decoded"""
+        self.stop_video()
+        self.live_results = []
+        self.video_source = os.path.basename(file_path)
+        self.video_thread = VideoScanThread(file_path, scan_frame)
+        self.video_deduplicator = self.video_thread.deduplicator
+        self.video_thread.scan_finished.connect(self.video_finished)
+        self.video_thread.start()
+        self.rendered_video_seq = 0
+        refresh_rate = QApplication.primaryScreen().refreshRate() or 60
+        self.video_timer.start(max(int(1000 / refresh_rate), 1))
+        self.update_status(f"Scanning video {file_path}...")
+
+    def render_video(self):
+        """Show the newest scanned video frame and record new payloads with their timestamp"""
+        thread = self.video_thread
+        if thread is None:
+            return
+        for timestamp, decoded_objects in thread.take_scans():
+            minutes, seconds = divmod(timestamp, 60)
+            self.record_scans(decoded_objects, f"{self.video_source} @ {int(minutes):02d}:{seconds:05.2f}")
+        latest = thread.latest_frame
+        if latest is None or latest[0] == self.rendered_video_seq:
+            return
+        self.rendered_video_seq, frame, self.live_results = latest
+        self.show_live_frame(frame)
+
+    def video_finished(self, stats):
+        # Show the last frame and record what was found since the last tick
+        self.render_video()
+        self.video_timer.stop()
+        if not stats:
+            QMessageBox.critical(self, "Error", "Could not read the video file.")
+            self.update_status("Video processing failed")
+            return
+        self.update_status(
+            f"Video done: scanned {stats['frames_sampled']} of {stats['frames_read']} frames, "
+            f"found {len(self.video_deduplicator.last_seen)} code(s)"
+        )
+
+    def stop_video(self):
+        if self.video_thread:
+            self.video_thread.stop()
+            self.video_thread = None
+        self.video_timer.stop()
+
     def show_image(self, cv_img):
         """Display the image in the GUI"""
         # Calculate dimensions to maintain aspect ratio
@@ -391,61 +1142,96 @@ Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
         
         self.image_label.setPixmap(scaled_pixmap)
 
-    def display_result(self, info_list):
-        """Display the decoded results"""
-        self.result_text.clear()
-        if info_list:
-            for line in info_list:
-                self.result_text.append(line)
-                
-                # Highlight URLs
-                if line.lower().startswith(("http://", "https://")):
-                    cursor = self.result_text.textCursor()
-                    cursor.movePosition(QTextCursor.StartOfLine)
-                    cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor)
-                    
-                    fmt = QTextCharFormat()
-                    fmt.setForeground(QColor("#1e90ff"))
-                    fmt.setAnchor(True)
-                    fmt.setAnchorHref(line.split(": ")[1])
-                    cursor.mergeCharFormat(fmt)
-                    self.result_text.setTextCursor(cursor)
-                    
-            # Scroll to top
-            self.result_text.moveCursor(QTextCursor.Start)
-        else:
-            self.result_text.setText("❌ No QR/Data Matrix code detected.")
-
     def clear_all(self):
         """Clear the current image and results"""
+        self.stop_video()
         self.image_label.clear()
-        self.result_text.clear()
+        self.history_model.clear()
         self.update_status("Ready")
 
     def start_camera(self):
         """Start the camera for live scanning"""
-        if self.camera_thread and self.camera_thread.isRunning():
+        if (self.camera_thread and self.camera_thread.isRunning()) or self.camera_threads:
             return
             
         if self.camera_combo.count() == 0:
             QMessageBox.critical(self, "Error", "No camera selected!")
             return
+        
+        if self.multi_check.isChecked():
+            self.start_multi_camera()
+            return
             
         cam_index = self.camera_combo.currentData()
+        self.live_results = []
+        self.live_source = f"Camera {cam_index}"
+        self.deduplicator.reset()
+        if self.track_check.isChecked():
+            self.tracker = CodeTracker(scanner.decode)
+            self.decode_worker = DecodeWorker(self.tracker.scan)
+        else:
+            self.tracker = None
+            self.decode_worker = DecodeWorker(scan_frame)
+        self.decode_worker.results_ready.connect(self.process_results)
+        self.decode_worker.decode_failed.connect(self.decode_failed)
+        self.decode_worker.start()
+        
         self.camera_thread = CameraThread(cam_index)
-        self.camera_thread.frame_ready.connect(self.process_frame)
+        self.camera_thread.frame_listeners.append(self.decode_worker.submit)
         self.camera_thread.start()
+        self.rendered_seq = 0
+        self.start_live_view()
+        self.update_status(f"Live scanning started (Camera {cam_index})")
+
+    def start_multi_camera(self):
+        """Start every detected camera, up to MULTI_CAMERA_MAX, on one shared decode pool"""
+        cameras = [self.camera_combo.itemData(i) for i in range(self.camera_combo.count())][:MULTI_CAMERA_MAX]
+        self.live_results = []
+        self.camera_frames = {}
+        self.camera_results = {}
+        self.rendered_seqs = {}
+        self.tile_canvas = None
+        # One deduplicator for all cameras, so a payload seen by several is recorded once
+        self.deduplicator.reset()
+        if self.track_check.isChecked():
+            self.trackers = {camera: CodeTracker(scanner.decode) for camera in cameras}
+            scan_fns = {camera: tracker.scan for camera, tracker in self.trackers.items()}
+        else:
+            self.trackers = {}
+            scan_fns = {camera: scan_frame for camera in cameras}
+        workers = MULTI_CAMERA_DECODE_WORKERS or min(len(cameras), os.cpu_count() or 1)
+        pool = self.decode_pool = DecodePool(scan_fns, workers)
+        pool.results_ready.connect(self.process_camera_results)
+        pool.decode_failed.connect(lambda camera, error: self.decode_failed(error, camera))
+        pool.start()
+        
+        for camera in cameras:
+            thread = self.camera_threads[camera] = CameraThread(camera)
+            thread.frame_listeners.append(lambda frame, camera=camera: pool.submit(camera, frame))
+            thread.start()
+        self.start_live_view()
+        self.update_status(f"Live scanning started ({len(cameras)} cameras, {workers} decode threads)")
+
+    def start_live_view(self):
+        self.fps_timer.start(1000)
+        refresh_rate = QApplication.primaryScreen().refreshRate() or 60
+        self.render_timer.start(max(int(1000 / refresh_rate), 1))
         
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.snapshot_btn.setEnabled(True)
-        self.update_status(f"Live scanning started (Camera {cam_index})")
 
     def stop_camera(self):
         """Stop the live camera feed"""
         if self.camera_thread:
             self.camera_thread.stop()
             self.camera_thread = None
+        if self.decode_worker:
+            self.decode_worker.stop()
+            self.decode_worker = None
+        self.stop_multi_camera()
+        self.fps_timer.stop()
+        self.render_timer.stop()
             
         self.image_label.clear()
         self.start_btn.setEnabled(True)
@@ -453,8 +1239,25 @@ Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
         self.snapshot_btn.setEnabled(False)
         self.update_status("Live scanning stopped")
 
+    def stop_multi_camera(self):
+        # Cameras first, so nothing submits to the pool once it is stopped
+        for thread in self.camera_threads.values():
+            thread.stop()
+        self.camera_threads = {}
+        if self.decode_pool:
+            self.decode_pool.stop()
+            self.decode_pool = None
+
     def take_snapshot(self):
         """Take a snapshot from the live camera"""
+        if self.camera_threads:
+            # Multi-camera mode: save every camera's current frame
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            for camera, frame in self.camera_frames.items():
+                cv2.imwrite(f"snapshot_{timestamp}_cam{camera}.png", frame)
+            self.update_status(f"Saved {len(self.camera_frames)} snapshot(s) as snapshot_{timestamp}_cam*.png")
+            return
+        
         if not self.camera_thread or not self.camera_thread.isRunning():
             QMessageBox.warning(self, "Snapshot", "Camera is not active!")
             return
@@ -467,27 +1270,156 @@ Supported code types: QR Code, Data Matrix, UPC-A, UPC-E, EAN-8, EAN-13, etc.
             self.update_status(f"Snapshot saved as {filename}")
             
             # Also process the snapshot
-            frame, decoded_info = self.decode_image(self.current_frame.copy())
+            frame, decoded_objects = self.decode_image(self.current_frame.copy())
             self.show_image(frame)
-            self.display_result(decoded_info)
-            self.scan_count += 1
-            self.last_scan_time = datetime.now()
+            self.record_scans(decoded_objects, filename)
 
-    def process_frame(self, frame):
-        """Process each frame from the camera"""
-        self.current_frame = frame.copy()
-        decoded_frame, info = self.decode_image(frame)
-        self.show_image(decoded_frame)
+    def render_latest_frame(self):
+        """Show the newest camera frame, if it hasn't been shown yet"""
+        if self.camera_threads:
+            self.render_latest_tiles()
+            return
+        if not self.camera_thread or self.camera_thread.latest_frame is None:
+            return
+        seq, frame = self.camera_thread.latest_frame
+        if seq == self.rendered_seq:
+            return
+        self.rendered_seq = seq
         
-        if info:  # Only update results if something was detected
-            self.display_result(info)
-            self.scan_count += 1
-            self.last_scan_time = datetime.now()
+        start = time.thread_time()
+        self.current_frame = frame
+        if LEGACY_RENDER:
+            display_frame = frame.copy()
+            self.draw_results(display_frame, self.live_results)
+            self.show_image(display_frame)
+        else:
+            self.show_live_frame(frame)
+        self.display_fps.tick()
+        
+        # Exponential moving average of GUI-thread CPU time per rendered frame
+        elapsed_ms = (time.thread_time() - start) * 1000
+        self.render_cpu_ms = 0.9 * self.render_cpu_ms + 0.1 * elapsed_ms
+
+    def render_latest_tiles(self):
+        """Redraw the preview tiles of cameras that have a frame not shown yet"""
+        fresh = []
+        for camera, thread in self.camera_threads.items():
+            latest = thread.latest_frame
+            if latest is not None and latest[0] != self.rendered_seqs.get(camera):
+                self.rendered_seqs[camera], self.camera_frames[camera] = latest
+                fresh.append(camera)
+        if not fresh:
+            return
+        
+        start = time.thread_time()
+        self.show_tiled_frames(fresh)
+        self.display_fps.tick()
+        elapsed_ms = (time.thread_time() - start) * 1000
+        self.render_cpu_ms = 0.9 * self.render_cpu_ms + 0.1 * elapsed_ms
+
+    def show_tiled_frames(self, cameras):
+        """Draw the newest frames of the given cameras into their tiles of a grid that fills the label.
+
+        Other tiles keep what they showed, so a new frame costs one downscale of
+        that camera's frame however many cameras there are.
+        """
+        order = list(self.camera_threads)
+        columns = int(np.ceil(np.sqrt(len(order))))
+        rows = int(np.ceil(len(order) / columns))
+        tile_width = max(self.image_label.width() // columns, 1)
+        tile_height = max(self.image_label.height() // rows, 1)
+        shape = (tile_height * rows, tile_width * columns, 3)
+        if self.tile_canvas is None or self.tile_canvas.shape != shape:
+            # First frame or the window was resized: redraw every tile
+            self.tile_canvas = np.zeros(shape, np.uint8)
+            self.rgb_buffer = np.empty(shape, np.uint8)
+            cameras = list(self.camera_frames)
+        
+        for camera in cameras:
+            frame = self.camera_frames[camera]
+            height, width = frame.shape[:2]
+            scale = min(tile_width / width, tile_height / height)
+            target = (max(int(width * scale), 1), max(int(height * scale), 1))
+            small = cv2.resize(frame, target, interpolation=cv2.INTER_LINEAR)
+            self.draw_results(small, self.camera_results.get(camera, []), scale)
+            cv2.putText(small, f"Cam {camera}", (8, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            row, column = divmod(order.index(camera), columns)
+            y = row * tile_height + (tile_height - target[1]) // 2
+            x = column * tile_width + (tile_width - target[0]) // 2
+            self.tile_canvas[y:y + target[1], x:x + target[0]] = small
+        
+        cv2.cvtColor(self.tile_canvas, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+        q_img = QImage(self.rgb_buffer.data, shape[1], shape[0], 3 * shape[1], QImage.Format_RGB888)
+        self.image_label.setPixmap(QPixmap.fromImage(q_img))
+
+    def show_live_frame(self, frame):
+        """Display a camera frame with one downscale and one color conversion.
+
+        The frame is resized straight to the label size with a fast
+        interpolation, overlays are drawn on that small image, and the BGR->RGB
+        conversion writes into a reused buffer that Qt reads as RGB888.
+        """
+        height, width = frame.shape[:2]
+        scale = min(self.image_label.width() / width, self.image_label.height() / height)
+        target = (max(int(width * scale), 1), max(int(height * scale), 1))
+        small = cv2.resize(frame, target, interpolation=cv2.INTER_LINEAR)
+        self.draw_results(small, self.live_results, scale)
+        
+        if self.rgb_buffer is None or self.rgb_buffer.shape != small.shape:
+            self.rgb_buffer = np.empty_like(small)
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+        q_img = QImage(self.rgb_buffer.data, target[0], target[1], 3 * target[0], QImage.Format_RGB888)
+        self.image_label.setPixmap(QPixmap.fromImage(q_img))
+
+    def process_results(self, decoded_objects):
+        """Handle results delivered by the decode worker"""
+        self.live_results = decoded_objects
+        # Only new or expired payloads are recorded
+        self.record_scans(self.deduplicator.filter(decoded_objects), self.live_source)
+
+    def process_camera_results(self, camera, decoded_objects):
+        """Handle results from one camera of the decode pool, merged into one result list"""
+        self.camera_results[camera] = decoded_objects
+        self.record_scans(self.deduplicator.filter(decoded_objects), f"Camera {camera}")
+
+    def update_fps_status(self):
+        """Show display and decode rates while scanning live"""
+        if self.decode_pool:
+            cameras = " | ".join(
+                f"Cam {camera}: {fps} FPS, {latency_ms:.0f} ms, {dropped} dropped"
+                for camera, (fps, dropped, latency_ms) in self.decode_pool.camera_stats().items()
+            )
+            message = (
+                f"Live scanning | Display: {self.display_fps.fps} FPS | {cameras} | "
+                f"Render: {self.render_cpu_ms:.1f} ms/frame"
+            )
+        elif self.decode_worker:
+            message = (
+                f"Live scanning | Display: {self.display_fps.fps} FPS | "
+                f"Decode: {self.decode_worker.fps.fps} FPS | "
+                f"Dropped: {self.decode_worker.dropped_frames} | "
+                f"Render: {self.render_cpu_ms:.1f} ms/frame"
+            )
+            if self.tracker:
+                message += f" | ROI decodes: {self.tracker.roi_ratio:.0%}"
+        else:
+            return
+        decoders = ", ".join(f"{name} {stats['mean_ms']:.1f} ms" for name, stats in scanner.stats().items())
+        if decoders:
+            message += f" | {decoders}"
+        self.update_status(message)
 
     def closeEvent(self, event):
         """Clean up when closing the application"""
         if self.camera_thread and self.camera_thread.isRunning():
             self.camera_thread.stop()
+        if self.decode_worker and self.decode_worker.isRunning():
+            self.decode_worker.stop()
+        self.stop_multi_camera()
+        self.stop_video()
+        if self.export_thread:
+            self.export_thread.wait()
+        self.history.close()
         event.accept()
 
 if __name__ == "__main__":
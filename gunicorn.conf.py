@@ -0,0 +1,42 @@
+"""gunicorn settings for the web app.
+
+With INFERENCE_SERVER set to a Unix socket path, the master starts one shared
+inference process (a separate program, not a fork of the master) before
+forking the HTTP workers, so WEB_WORKERS can grow with the cores without
+loading the model once per worker.
+"""
+import os
+import subprocess
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_WORKERS', '1'))
+worker_class = 'gthread'
+# Each open /stream WebSocket holds a thread; app.py caps them at LIVE_STREAM_MAX (WEB_THREADS // 2 by default)
+threads = int(os.environ.get('WEB_THREADS', '8'))
+timeout = 120
+
+
+def on_starting(server):
+    address = os.environ.get('INFERENCE_SERVER')
+    if not address:
+        return
+    from inference_server import start_in_background
+    server.inference_process = start_in_background(
+        address,
+        model_path='best.pt',
+        backend=os.environ.get('INFERENCE_BACKEND', 'torch'),
+        int8=os.environ.get('INFERENCE_INT8', '0') == '1',
+        calibration_data=os.environ.get('INFERENCE_CALIBRATION_DATA') or None,
+        max_batch_size=int(os.environ.get('MICRO_BATCH_SIZE', '8')),
+        max_wait_ms=float(os.environ.get('MICRO_BATCH_WAIT_MS', '10')),
+    )
+
+
+def on_exit(server):
+    process = getattr(server, 'inference_process', None)
+    if process is not None:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
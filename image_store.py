@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+
+def source_size(source):
+    """Approximate bytes held for an image path, encoded bytes or BGR array"""
+    if isinstance(source, np.ndarray):
+        return source.nbytes
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        return 0
+
+
+class ImageStore:
+    """Annotated images that are only drawn when someone asks for them.
+
+    add() records an image source (path, encoded bytes or BGR array) with its
+    detections under a new processed_<uuid>.jpg name; nothing is drawn or
+    encoded then. get() renders the JPEG on first request and keeps it in a
+    separate cache so repeated fetches are free. Both the sources and the
+    rendered JPEGs are LRU caches bounded in bytes, and entries expire after
+    ttl seconds. Sources that are files inside upload_dir belong to the store
+    and are deleted when their entry is evicted. Files there older than ttl
+    (left by a process that restarted before evicting them) are swept at
+    startup and by expire().
+
+    With shared=True, sources and detections are also written to upload_dir
+    so that any process using the same directory (e.g. another gunicorn
+    worker) can render the image; each process then bounds what it wrote.
+    """
+
+    def __init__(self, render, max_bytes=256 * 1024 * 1024, max_render_bytes=64 * 1024 * 1024,
+                 ttl=3600, upload_dir=None, shared=False):
+        self.render = render
+        self.max_bytes = max_bytes
+        self.max_render_bytes = max_render_bytes
+        self.ttl = ttl
+        self.upload_dir = os.path.abspath(upload_dir) if upload_dir else None
+        self.shared = shared and self.upload_dir is not None
+        self._sources = OrderedDict()  # filename -> (expires_at, size, source, detections)
+        self._rendered = OrderedDict()  # filename -> (expires_at, jpeg)
+        self._source_bytes = 0
+        self._render_bytes = 0
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.render_hits = 0
+        self.evictions = 0
+        self._last_sweep = time.time()
+        self._sweep_upload_dir(self._last_sweep)
+
+    def add(self, source, detections):
+        """Remember how to draw an annotated image, returning its filename"""
+        if time.time() - self._last_sweep >= 60:
+            self.expire()
+        if isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        filename = f"processed_{uuid.uuid4()}.jpg"
+        size = source_size(source)
+        if self.shared:
+            source = self._persist(filename, source, detections)
+        evicted = []
+        with self._lock:
+            self._sources[filename] = (time.time() + self.ttl, size, source, detections)
+            self._source_bytes += size
+            while self._source_bytes > self.max_bytes and len(self._sources) > 1:
+                evicted.append(self._pop_source(next(iter(self._sources))))
+        self._discard(evicted)
+        return filename
+
+    def get(self, filename):
+        """Return the annotated JPEG for filename, rendering it if needed; None if unknown or expired"""
+        now = time.time()
+        evicted = []
+        with self._lock:
+            entry = self._rendered.get(filename)
+            if entry is not None and entry[0] > now:
+                self._rendered.move_to_end(filename)
+                self.render_hits += 1
+                return entry[1]
+            entry = self._sources.get(filename)
+            if entry is not None and entry[0] <= now:
+                evicted.append(self._pop_source(filename))
+                entry = None
+            elif entry is not None:
+                self._sources.move_to_end(filename)
+        self._discard(evicted)
+        if entry is None and self.shared:
+            entry = self._load(filename, now)
+        if entry is None:
+            return None
+
+        expires_at, _, source, detections = entry
+        if isinstance(source, str) and source.endswith('.npy'):
+            source = np.load(source)
+        jpeg = self.render(source, detections)
+        if jpeg is None:
+            return None
+        with self._lock:
+            self.renders += 1
+            if len(jpeg) <= self.max_render_bytes and filename not in self._rendered:
+                self._rendered[filename] = (expires_at, jpeg)
+                self._render_bytes += len(jpeg)
+                while self._render_bytes > self.max_render_bytes:
+                    _, (_, oldest) = self._rendered.popitem(last=False)
+                    self._render_bytes -= len(oldest)
+        return jpeg
+
+    def expire(self):
+        """Drop expired sources and rendered images, deleting owned upload files"""
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            evicted = [self._pop_source(name) for name, entry in list(self._sources.items()) if entry[0] <= now]
+            for name, (expires_at, jpeg) in list(self._rendered.items()):
+                if expires_at <= now:
+                    del self._rendered[name]
+                    self._render_bytes -= len(jpeg)
+        self._discard(evicted)
+        self._sweep_upload_dir(now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sources': len(self._sources),
+                'source_bytes': self._source_bytes,
+                'max_bytes': self.max_bytes,
+                'rendered': len(self._rendered),
+                'rendered_bytes': self._render_bytes,
+                'max_render_bytes': self.max_render_bytes,
+                'ttl': self.ttl,
+                'shared': self.shared,
+                'renders': self.renders,
+                'render_hits': self.render_hits,
+                'evictions': self.evictions,
+            }
+
+    def _sweep_upload_dir(self, now):
+        """Delete files in upload_dir whose entry must have expired, whichever process wrote them.
+
+        Any entry expires ttl seconds after its files were written, so this
+        never removes a file a live entry still needs.
+        """
+        if not self.upload_dir:
+            return
+        try:
+            entries = list(os.scandir(self.upload_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime + self.ttl <= now:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # Another worker swept it first
+
+    def _pop_source(self, filename):
+        """Remove a source entry (call with the lock held), returning (filename, source)"""
+        _, size, source, _ = self._sources.pop(filename)
+        self._source_bytes -= size
+        self.evictions += 1
+        return filename, source
+
+    def _sidecar(self, filename, extension):
+        return os.path.join(self.upload_dir, os.path.splitext(filename)[0] + extension)
+
+    def _persist(self, filename, source, detections):
+        """Write a source and its detections where other processes can find them, returning the source path"""
+        if isinstance(source, np.ndarray):
+            path = self._sidecar(filename, '.npy')
+            np.save(path, source)
+        elif isinstance(source, bytes):
+            path = self._sidecar(filename, '.src')
+            with open(path, 'wb') as f:
+                f.write(source)
+        else:
+            path = os.path.abspath(source)
+        metadata_path = self._sidecar(filename, '.json')
+        with open(f"{metadata_path}.tmp", 'w') as f:
+            json.dump({'source': path, 'detections': detections}, f)
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+        return path
+
+    def _load(self, filename, now):
+        """Read an entry another process persisted, or None if it is missing or expired"""
+        metadata_path = self._sidecar(filename, '.json')
+        try:
+            expires_at = os.path.getmtime(metadata_path) + self.ttl
+            if expires_at <= now:
+                return None
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return expires_at, 0, metadata['source'], metadata['detections']
+
+    def _discard(self, evicted):
+        """Delete the files of evicted (filename, source) entries that belong to the store"""
+        if not self.upload_dir:
+            return
+        for filename, source in evicted:
+            paths = []
+            if self.shared:
+                metadata_path = self._sidecar(filename, '.json')
+                if source is None:
+                    try:
+                        with open(metadata_path) as f:
+                            source = json.load(f)['source']
+                    except (OSError, ValueError):
+                        pass
+                paths.append(metadata_path)
+            if isinstance(source, str) and os.path.dirname(os.path.abspath(source)) == self.upload_dir:
+                paths.append(source)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,337 @@
+"""A single model process shared by all gunicorn workers.
+
+The server loads the detector once and listens on a Unix socket. Workers copy
+the images of a request into a shared memory segment they own and send only
+its name plus (offset, shape) of each image; the server maps the segment,
+runs the images through one micro-batching scheduler shared by every
+connection and answers with the boxes. Model memory is paid once, however
+many HTTP workers there are.
+
+    python inference_server.py /tmp/scanner-inference.sock
+
+gunicorn.conf.py starts it automatically when INFERENCE_SERVER is set.
+"""
+import argparse
+import atexit
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from scheduler import InferenceScheduler, SchedulerBusy
+
+DEFAULT_AUTHKEY = b'scanner-inference'
+CONNECT_TIMEOUT = 120  # Seconds a worker waits for the server to come up (model loading included)
+# /dev/shm is small in containers (64 MB by default in Docker), so a worker keeps a thread's
+# segment for reuse only while it is at most SHM_KEEP_BYTES and all kept segments together
+# stay within SHM_MAX_BYTES; larger ones are unlinked after their request
+SHM_KEEP_BYTES = int(os.environ.get('INFERENCE_SHM_KEEP_MB', '8')) * 1024 * 1024
+SHM_MAX_BYTES = int(os.environ.get('INFERENCE_SHM_MAX_MB', '32')) * 1024 * 1024
+SHM_DIR = '/dev/shm'
+
+
+def authkey():
+    return os.environ.get('INFERENCE_SERVER_AUTHKEY', '').encode('utf-8') or DEFAULT_AUTHKEY
+
+
+def check_shm_space(size):
+    """Fail cleanly when /dev/shm can't hold size more bytes; writing past it would SIGBUS the worker"""
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except OSError:
+        return
+    if stats.f_bavail * stats.f_frsize < size:
+        raise RuntimeError(f"Not enough shared memory in {SHM_DIR} for a {size / 2**20:.0f} MB image buffer; "
+                           f"raise the container's shm size (docker run --shm-size)")
+
+
+def process_memory(pid='self'):
+    """RSS and PSS (proportional set size, shared pages split between processes) in bytes.
+
+    Linux only; returns None values elsewhere or for processes that are gone.
+    """
+    memory = {'rss': None, 'pss': None}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss'):
+                    memory[name.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        memory['rss'] = int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return memory
+
+
+class InferenceClient:
+    """Sends images to the inference server; one connection and shared buffer per thread.
+
+    A thread's buffer is reused across requests while it fits the keep_bytes /
+    max_bytes limits; an oversized one is released once its request is answered.
+    """
+
+    def __init__(self, address, connect_timeout=CONNECT_TIMEOUT, keep_bytes=SHM_KEEP_BYTES,
+                 max_bytes=SHM_MAX_BYTES):
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self.keep_bytes = keep_bytes
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._buffers = set()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            return connection
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                connection = Client(self.address, family='AF_UNIX', authkey=authkey())
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Inference server at {self.address} is not running")
+                time.sleep(0.5)
+        connection.send(('hello', os.getpid()))
+        connection.recv()
+        self._local.connection = connection
+        return connection
+
+    def _buffer(self, size):
+        """This thread's shared memory segment, grown to at least size bytes"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.size < size:
+            if buffer is not None:
+                self._release(buffer)
+            capacity = 1 << max(size - 1, 1).bit_length()
+            if capacity > self.keep_bytes:
+                # Won't be kept anyway, so don't round up past what is needed
+                capacity = size
+            check_shm_space(capacity)
+            buffer = self._local.buffer = shared_memory.SharedMemory(create=True, size=capacity)
+            with self._lock:
+                self._buffers.add(buffer)
+        return buffer
+
+    def _keep(self, buffer):
+        """Whether buffer stays within the limits for reuse"""
+        if buffer.size > self.keep_bytes:
+            return False
+        with self._lock:
+            return sum(kept.size for kept in self._buffers) <= self.max_bytes
+
+    def _release(self, buffer):
+        with self._lock:
+            self._buffers.discard(buffer)
+        buffer.close()
+        buffer.unlink()
+
+    def _request(self, message):
+        connection = self._connection()
+        try:
+            connection.send(message)
+            status, payload = connection.recv()
+        except (EOFError, OSError):
+            # The server restarted; reconnect on the next call
+            self._local.connection = None
+            raise RuntimeError("Lost connection to the inference server")
+        if status == 'busy':
+            raise SchedulerBusy(payload)
+        if status != 'ok':
+            raise RuntimeError(payload)
+        return payload
+
+    def infer(self, images):
+        """Boxes for each image, in the format of backends.extract_boxes"""
+        images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+        buffer = self._buffer(sum(image.nbytes for image in images))
+        layout = []
+        offset = 0
+        for image in images:
+            np.ndarray(image.shape, np.uint8, buffer=buffer.buf, offset=offset)[...] = image
+            layout.append((offset, image.shape))
+            offset += image.nbytes
+        keep = self._keep(buffer)
+        try:
+            return self._request(('infer', (buffer.name, layout, keep)))
+        finally:
+            if not keep:
+                self._local.buffer = None
+                self._release(buffer)
+
+    def ready(self):
+        """Whether the server accepts connections; it only listens once its model is warmed up"""
+        try:
+            Client(self.address, family='AF_UNIX', authkey=authkey()).close()
+        except (OSError, AuthenticationError):
+            return False
+        return True
+
+    def stats(self):
+        return self._request(('stats', None))
+
+    def close(self):
+        """Unlink every thread's shared memory segment"""
+        with self._lock:
+            buffers = list(self._buffers)
+        for buffer in buffers:
+            self._release(buffer)
+
+
+class InferenceServer:
+    """Owns the model; one thread per worker connection feeds a shared scheduler"""
+
+    def __init__(self, address, infer_batch, max_batch_size=8, max_wait_ms=10):
+        self.address = address
+        self.scheduler = InferenceScheduler(infer_batch, max_batch_size=max_batch_size,
+                                            max_wait_ms=max_wait_ms, max_queue=1024)
+        self.clients = {}  # connection thread name -> worker pid
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, family='AF_UNIX', authkey=authkey()) as listener:
+            while True:
+                connection = listener.accept()
+                threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        segments = {}  # name -> attached SharedMemory
+        name = threading.current_thread().name
+        try:
+            while True:
+                try:
+                    kind, payload = connection.recv()
+                except EOFError:
+                    return
+                try:
+                    if kind == 'infer':
+                        result = self._infer(segments, *payload)
+                    elif kind == 'hello':
+                        with self._lock:
+                            self.clients[name] = payload
+                        result = None
+                    else:
+                        result = self.stats()
+                    connection.send(('ok', result))
+                except SchedulerBusy as e:
+                    connection.send(('busy', str(e)))
+                except Exception as e:
+                    connection.send(('error', str(e)))
+        finally:
+            for segment in segments.values():
+                segment.close()
+            with self._lock:
+                self.clients.pop(name, None)
+            connection.close()
+
+    @staticmethod
+    def _detach(segments):
+        """Unmap segments no request uses any more; one still referenced is retried next time"""
+        for name, segment in list(segments.items()):
+            try:
+                segment.close()
+            except BufferError:
+                continue
+            del segments[name]
+
+    def _attach(self, segments, segment_name):
+        segment = segments.get(segment_name)
+        if segment is None:
+            # The client grew its buffer: drop the old mapping and map the new one
+            self._detach(segments)
+            segment = segments[segment_name] = shared_memory.SharedMemory(name=segment_name)
+            # The creating worker owns the segment; don't let this process unlink it at exit
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+    def _infer(self, segments, segment_name, layout, keep=True):
+        # Zero-copy views into the worker's segment; they are gone before the segment is closed
+        segment = self._attach(segments, segment_name)
+        images = [np.ndarray(shape, np.uint8, buffer=segment.buf, offset=offset) for offset, shape in layout]
+        try:
+            return self.scheduler.infer_many(images)
+        finally:
+            if not keep:
+                # The worker unlinks it now; unmap too so the memory is actually freed
+                del images
+                self._detach(segments)
+
+    def stats(self):
+        with self._lock:
+            connections = len(self.clients)
+            pids = sorted(set(self.clients.values()))
+        return {
+            'pid': os.getpid(),
+            'memory': process_memory(),
+            'connections': connections,
+            'workers': {pid: process_memory(pid) for pid in pids},
+            'scheduler': self.scheduler.stats(),
+        }
+
+
+def serve(address, model_path, backend='torch', int8=False, calibration_data=None,
+          batch_size=16, max_batch_size=8, max_wait_ms=10):
+    started = time.perf_counter()
+    from backends import load_model, predict_boxes
+    model = load_model(model_path, backend, int8=int8, calibration_data=calibration_data)
+    loaded = time.perf_counter()
+    # Warm up before listening, so workers only connect to a server that answers at full speed
+    predict_boxes(model, [np.zeros((640, 640, 3), dtype=np.uint8)], 1)
+    server = InferenceServer(address, lambda images: predict_boxes(model, images, batch_size),
+                             max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    print(f"Inference server ({backend}) listening on {address} "
+          f"(model loaded in {loaded - started:.3f}s, warmed up in {time.perf_counter() - loaded:.3f}s)",
+          file=sys.stderr, flush=True)
+    server.serve_forever()
+
+
+def start_in_background(address, model_path='best.pt', backend='torch', int8=False, calibration_data=None,
+                        batch_size=16, max_batch_size=8, max_wait_ms=10):
+    """Start the server as a separate program (used from gunicorn's master before it forks workers).
+
+    Not a multiprocessing child: gunicorn workers are forks of the master and
+    would inherit multiprocessing's exit handler, which terminates daemon
+    children when a worker exits and would take the shared server down with it.
+    """
+    command = [sys.executable, os.path.abspath(__file__), address, '--model', model_path,
+               '--backend', backend, '--batch-size', str(batch_size),
+               '--max-batch-size', str(max_batch_size), '--max-wait-ms', str(max_wait_ms)]
+    if int8:
+        command.append('--int8')
+    if calibration_data:
+        command += ['--calibration-data', calibration_data]
+    return subprocess.Popen(command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('address', nargs='?', default=os.environ.get('INFERENCE_SERVER', '/tmp/scanner-inference.sock'))
+    parser.add_argument('--model', default='best.pt')
+    parser.add_argument('--backend', default=os.environ.get('INFERENCE_BACKEND', 'torch'))
+    parser.add_argument('--int8', action='store_true', default=os.environ.get('INFERENCE_INT8', '0') == '1')
+    parser.add_argument('--calibration-data', default=os.environ.get('INFERENCE_CALIBRATION_DATA') or None)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--max-batch-size', type=int, default=int(os.environ.get('MICRO_BATCH_SIZE', '8')))
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.environ.get('MICRO_BATCH_WAIT_MS', '10')))
+    args = parser.parse_args()
+    serve(args.address, args.model, args.backend, int8=args.int8,
+          calibration_data=args.calibration_data, batch_size=args.batch_size,
+          max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        job = {'job_id': self.id, 'status': self.status}
+        if self.status == 'done':
+            job['result'] = self.result
+        elif self.status == 'failed':
+            job['error'] = self.error
+        return job
+
+
+class JobQueue:
+    """Runs submitted work on a pool of worker threads, keeping results for polling.
+
+    submit() returns at once with a job id. The queue is bounded: once
+    max_queue jobs are waiting, submit() raises JobQueueFull so callers can
+    shed load instead of piling up latency. Finished jobs are kept for
+    result_ttl seconds, then forgotten.
+
+    With shared_dir set, each job's state is also written there as JSON, so
+    other processes sharing the directory (e.g. gunicorn workers) can answer
+    polls for jobs they did not run.
+    """
+
+    def __init__(self, handler, workers=2, max_queue=64, result_ttl=600, shared_dir=None):
+        self.handler = handler
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.shared_dir = shared_dir
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, payload):
+        """Queue a job, returning it. Raises JobQueueFull when the queue is saturated."""
+        job = Job(payload)
+        with self._lock:
+            self._expire()
+            if self._queue.full():
+                self.rejected += 1
+                raise JobQueueFull("Job queue is full, try again later")
+            # Published before a worker can pick it up, so 'queued' never overwrites a later state
+            self._publish(job)
+            self._queue.put_nowait(job)
+            self._jobs[job.id] = job
+            self.submitted += 1
+        return job
+
+    def get(self, job_id, wait=0):
+        """A job's state as a dict, blocking up to wait seconds for it to finish. None if unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            if wait > 0:
+                job.done.wait(wait)
+            return job.to_dict()
+        if not self.shared_dir or not job_id.isalnum():
+            return None
+
+        # Submitted to another process: follow its published state
+        deadline = time.monotonic() + wait
+        while True:
+            state = self._read_published(job_id)
+            if state is None or state['status'] in ('done', 'failed') or time.monotonic() >= deadline:
+                return state
+            time.sleep(0.1)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                'queued': self._queue.qsize(),
+                'running': statuses.count('running'),
+                'max_queue': self.max_queue,
+                'workers': len(self._threads),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+    def _expire(self):
+        """Forget finished jobs older than result_ttl (call with the lock held)"""
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.shared_dir and expired:
+            # Includes files left behind by processes that have exited
+            for path in glob.glob(os.path.join(self.shared_dir, '*.json')):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def _published_path(self, job_id):
+        return os.path.join(self.shared_dir, f"{job_id}.json")
+
+    def _publish(self, job):
+        if not self.shared_dir:
+            return
+        path = self._published_path(job.id)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(job.to_dict(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_published(self, job_id):
+        try:
+            with open(self._published_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = 'running'
+            self._publish(job)
+            try:
+                job.result = self.handler(job.payload)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            # Drop the input as soon as it is processed; only the result is polled
+            job.payload = None
+            job.finished = time.time()
+            with self._lock:
+                if job.status == 'done':
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self._publish(job)
+            job.done.set()
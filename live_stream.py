@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+
+class LiveStream:
+    """Decodes the newest frame of one live camera connection.
+
+    Frames received while a decode is running replace each other in a single
+    slot instead of queueing, so a slow decode never builds up latency: the
+    decode thread always picks up the most recent frame and the ones in
+    between are counted as dropped. Each decoded frame is answered with one
+    JSON message holding its sequence number and detections.
+    """
+
+    def __init__(self, decode, send):
+        self.decode = decode
+        self.send = send
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self._frame = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='live-stream', daemon=True)
+        self._thread.start()
+
+    def push(self, data):
+        """Offer a new encoded frame, dropping the pending one if it was never decoded"""
+        with self._condition:
+            self.frames_received += 1
+            if self._frame is not None:
+                self.frames_dropped += 1
+            self._frame = (self.frames_received, data)
+            self._condition.notify()
+
+    def _take(self):
+        with self._condition:
+            while self._frame is None and not self._closed:
+                self._condition.wait()
+            frame, self._frame = self._frame, None
+            return None if self._closed else frame
+
+    def _run(self):
+        while True:
+            frame = self._take()
+            if frame is None:
+                return
+            seq, data = frame
+            start = time.perf_counter()
+            results, error = self.decode(data)
+            message = {'seq': seq, 'ms': round((time.perf_counter() - start) * 1000, 1)}
+            if results is None:
+                message['error'] = error
+            else:
+                message['results'] = results
+            with self._condition:
+                self.frames_decoded += 1
+                message['dropped'] = self.frames_dropped
+            try:
+                self.send(json.dumps(message))
+            except Exception:
+                # The client went away; the receive loop will notice too
+                self._closed = True
+                return
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'frames_received': self.frames_received,
+                'frames_decoded': self.frames_decoded,
+                'frames_dropped': self.frames_dropped,
+            }
@@ -0,0 +1,174 @@
+"""Counters and latency histograms for the decode pipeline, in Prometheus text format.
+
+A deliberately small stand-in for prometheus_client: metrics live in one
+process and are rendered by Metrics.render() for a /metrics endpoint. When a
+Metrics object is disabled, updates return immediately and timers only run
+while a per-request breakdown is being collected.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a cached lookup to a slow Data Matrix ladder
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, metrics, name, help, labels=()):
+        self.metrics = metrics
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not self.metrics.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}"
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, metrics, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.metrics = metrics
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not self.metrics.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            all_series = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(all_series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                labels = format_labels(self.labels, label_values, [('le', format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {format_value(series[-2])}"
+            yield f"{self.name}_count{labels} {series[-1]}"
+
+
+class Gauge:
+    """A value read from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, metrics, name, help, read):
+        self.metrics = metrics
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def samples(self):
+        yield f"{self.name} {format_value(self.read())}"
+
+
+class Metrics:
+    """Registry of the pipeline's metrics plus the per-stage timer"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._local = threading.local()
+        self.stage_seconds = self.histogram(
+            'scanner_stage_seconds', 'Time spent in each pipeline stage', ('stage',))
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def gauge(self, name, help, read):
+        return self._register(Gauge(self, name, help, read))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as pipeline stage name, adding it to the current breakdown if any"""
+        breakdown = getattr(self._local, 'breakdown', None)
+        if not self.enabled and breakdown is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, name)
+            if breakdown is not None:
+                breakdown[name] = breakdown.get(name, 0.0) + elapsed * 1000
+
+    def add_to_breakdown(self, name, seconds):
+        """Add time measured elsewhere (e.g. on a pool worker) to the current breakdown, if any"""
+        breakdown = getattr(self._local, 'breakdown', None)
+        if breakdown is not None:
+            breakdown[name] = breakdown.get(name, 0.0) + seconds * 1000
+
+    @contextmanager
+    def breakdown(self, active=True):
+        """Collect stage times (ms) spent on this thread into the yielded dict; None when not active"""
+        if not active:
+            yield None
+            return
+        timings = {}
+        self._local.breakdown = timings
+        try:
+            yield timings
+        finally:
+            self._local.breakdown = None
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DISK_SWEEP_INTERVAL = 60  # Seconds between sweeps of the disk tier
+
+
+class ResultCache:
+    """Content-addressed LRU cache for decode results.
+
+    Entries are evicted when the cache holds more than max_entries items or
+    max_bytes of (JSON-encoded) results, and expire after ttl seconds. When
+    disk_dir is set, entries are also written there as JSON files so they
+    survive restarts and can be shared between worker processes. Writes
+    trigger a sweep of that directory at most every DISK_SWEEP_INTERVAL
+    seconds, on a background thread: expired files are deleted, then the
+    least recently written ones until the tier is within disk_max_entries
+    files and disk_max_bytes.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=3600, disk_dir=None,
+                 disk_max_entries=100_000, disk_max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._last_sweep = 0.0
+        self._sweeping = False
+        self.disk_evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data, config=''):
+        """Hash the image bytes together with the pipeline configuration"""
+        digest = hashlib.sha256(data)
+        digest.update(b'\0' + config.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, value, now)
+        return value
+
+    def put(self, key, value):
+        """Store a JSON-serialisable value"""
+        now = time.time()
+        with self._lock:
+            self._insert(key, value, now)
+        self._write_disk(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _insert(self, key, value, now):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (now + self.ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if self._sweeping or now - self._last_sweep < DISK_SWEEP_INTERVAL:
+                return
+            self._sweeping = True
+            self._last_sweep = now
+        threading.Thread(target=self.sweep_disk, name='result-cache-sweep', daemon=True).start()
+
+    def sweep_disk(self):
+        """Delete expired disk entries, then the oldest ones beyond the disk caps; returns how many went"""
+        now = time.time()
+        removed = 0
+        files = []  # (mtime, size, path) of live entries
+        try:
+            for shard in os.scandir(self.disk_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        stat = entry.stat()
+                        # Temp files left behind by a crashed writer are dropped once expired as well
+                        if stat.st_mtime + self.ttl <= now:
+                            os.remove(entry.path)
+                            removed += 1
+                        elif entry.name.endswith('.json'):
+                            files.append((stat.st_mtime, stat.st_size, entry.path))
+                    except OSError:
+                        continue  # Another worker removed it first
+
+            files.sort()
+            total_bytes = sum(size for _, size, _ in files)
+            excess = len(files) - self.disk_max_entries
+            for _, size, path in files:
+                if excess <= 0 and total_bytes <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+                excess -= 1
+                total_bytes -= size
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sweeping = False
+                self.disk_evictions += removed
+        return removed
@@ -0,0 +1,255 @@
+"""Headless batch scanner: decode QR / Data Matrix codes in many images from the command line.
+
+Uses the same pipeline as the web app's /decode (YOLO detection, then pyzbar /
+libdmtx on each crop), spread over a pool of worker processes that each load
+the model once. One JSON line per image is written, in input order, as soon
+as it and every image before it are done.
+
+    python scan_cli.py archive/ "more/**/*.jpg" -o results.jsonl --checkpoint scan.ckpt
+
+Re-running the same command with the same --checkpoint resumes where the last
+run stopped. Directories are walked lazily and only a bounded number of
+batches is in flight, so memory stays flat however many files there are.
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+# Set in each worker process by init_worker
+pipeline = None
+
+
+def iter_paths(inputs, recursive=True):
+    """Yield image paths from files, directories and glob patterns in a stable order"""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                if not recursive:
+                    dirs.clear()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(item):
+            yield item
+        else:
+            # iglob's order depends on the filesystem; resuming by position needs a fixed one
+            for path in sorted(glob.glob(item, recursive=recursive)):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    yield path
+
+
+def iter_batches(paths, batch_size, start_index=0, resume_path=None):
+    """Group (index, path) pairs into batches, skipping the first start_index paths.
+
+    When resuming, the last skipped path must be resume_path (the last one the
+    checkpoint recorded); otherwise files were added, removed or renamed and
+    positions no longer match, so this exits instead of skipping the wrong files.
+    """
+    batch = []
+    index = -1
+    for index, path in enumerate(paths):
+        if index < start_index:
+            if index == start_index - 1 and resume_path is not None and path != resume_path:
+                raise SystemExit(f"The inputs changed since the checkpoint: image {index} is {path}, "
+                                 f"not {resume_path}; start again without the checkpoint")
+            continue
+        batch.append((index, path))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if index < start_index - 1:
+        raise SystemExit(f"The inputs changed since the checkpoint: only {index + 1} images left "
+                         f"of the {start_index} already scanned")
+    if batch:
+        yield batch
+
+
+def init_worker(options):
+    """Load the pipeline (and with it the model) once per worker process.
+
+    Fails if the model doesn't load, which breaks the pool instead of
+    recording every image as an error and checkpointing past them.
+    """
+    global pipeline
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.update(options)
+    import app
+    if app.inference_client is None:
+        if not app.model_ready.wait(app.MODEL_LOAD_TIMEOUT):
+            raise RuntimeError("Timed out waiting for the model to load")
+        if app.model is None:
+            raise RuntimeError(f"The model failed to load: {app.model_error}")
+    pipeline = app
+
+
+def scan_batch(batch, exhaustive):
+    """Decode one batch of (index, path) pairs with batched YOLO inference.
+
+    Errors of single images are recorded; a failing model raises, so the
+    batch isn't counted as done.
+    """
+    start = time.perf_counter()
+    outputs = pipeline.detect_and_decode_batch([path for _, path in batch], annotate=False,
+                                               exhaustive=exhaustive, strict=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(batch)
+
+    records = []
+    for (index, path), (results, error) in zip(batch, outputs):
+        record = {'index': index, 'file': path}
+        if results is None:
+            record['error'] = error
+        else:
+            record['results'] = results
+            record['path'] = pipeline.result_path(results)
+        record['ms'] = round(elapsed_ms, 1)
+        records.append(record)
+    return records
+
+
+class Checkpoint:
+    """Tracks the lowest index below which every image is written.
+
+    Batches finish out of order, so records above the watermark are held and
+    written once the gap closes; the held records never exceed the in-flight
+    window. The output is written in index order and saved with its size, and
+    a resumed run truncates it back to that size, so no record is written twice.
+    """
+
+    def __init__(self, path, inputs):
+        self.path = path
+        self.inputs = inputs
+        self.next_index = 0
+        self.last_path = None  # Path of image next_index - 1, checked on resume
+        self.output_size = None
+        self.held = {}  # index -> finished record above the watermark
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('inputs') != inputs:
+                raise SystemExit(f"Checkpoint {path} was written for different inputs: {state.get('inputs')}")
+            self.next_index = state['next_index']
+            self.last_path = state.get('last_path')
+            self.output_size = state.get('output_size')
+
+    def add(self, record):
+        """Hold a finished record; returns the records now ready to write, in index order"""
+        self.held[record['index']] = record
+        ready = []
+        while self.next_index in self.held:
+            ready.append(self.held.pop(self.next_index))
+            self.last_path = ready[-1]['file']
+            self.next_index += 1
+        return ready
+
+    def save(self, output_size=None):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'inputs': self.inputs, 'next_index': self.next_index, 'last_path': self.last_path,
+                       'output_size': output_size}, f)
+        os.replace(tmp_path, self.path)
+
+
+def open_output(path, checkpoint):
+    """Open the output, dropping anything written after the checkpoint when resuming"""
+    if not checkpoint.next_index:
+        return open(path, 'w')
+    output = open(path, 'a')
+    if checkpoint.output_size is not None and os.path.getsize(path) > checkpoint.output_size:
+        output.truncate(checkpoint.output_size)
+    return output
+
+
+def output_size(output):
+    return None if output is sys.stdout else os.fstat(output.fileno()).st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Image files, directories or glob patterns')
+    parser.add_argument('-o', '--output', help='JSONL output file (default: stdout)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('-b', '--batch-size', type=int, default=8, help='Images per YOLO forward pass')
+    parser.add_argument('--checkpoint', help='Resume from / record progress in this file')
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="Don't descend into subdirectories or expand ** in patterns")
+    parser.add_argument('--cascade', action='store_true', help='Try a direct decode before running YOLO')
+    parser.add_argument('--exhaustive', action='store_true', help='Always run YOLO, even with --cascade')
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, args.inputs)
+    # Processes already give parallelism; keep each one from using every core
+    worker_env = {
+        'MICRO_BATCHING': '0',
+        'DECODE_WORKERS': '1',
+        'INFERENCE_THREADS': os.environ.get('INFERENCE_THREADS', str(max((os.cpu_count() or 1) // args.workers, 1))),
+        'CASCADE': '1' if args.cascade else '0',
+        # Archive images rarely repeat, so hashing and caching each one is wasted work
+        'RESULT_CACHE_SIZE': '0',
+    }
+
+    output = open_output(args.output, checkpoint) if args.output else sys.stdout
+
+    batches = iter_batches(iter_paths(args.inputs, not args.no_recursive), args.batch_size,
+                           checkpoint.next_index, checkpoint.last_path)
+    max_in_flight = args.workers * 2
+    scanned = errors = 0
+    failed = None
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(worker_env,)) as executor:
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < max_in_flight:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    in_flight.add(executor.submit(scan_batch, batch, args.exhaustive))
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for record in future.result():
+                        for ready in checkpoint.add(record):
+                            output.write(json.dumps(ready) + '\n')
+                            scanned += 1
+                            errors += 'error' in ready
+                output.flush()
+                checkpoint.save(output_size(output))
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            print("Interrupted, saving checkpoint", file=sys.stderr)
+        except Exception as e:
+            # The model or a worker failed: stop without marking the unfinished images done
+            for future in in_flight:
+                future.cancel()
+            failed = e
+        finally:
+            output.flush()
+            checkpoint.save(output_size(output))
+            if output is not sys.stdout:
+                output.close()
+
+    if failed is not None:
+        raise SystemExit(f"Scan failed after {scanned} images, checkpoint saved: {failed}")
+
+    elapsed = time.monotonic() - started
+    print(f"Scanned {scanned} images ({errors} errors) in {elapsed:.1f}s"
+          f" - {scanned / elapsed if elapsed else 0:.1f} images/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
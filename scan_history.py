@@ -0,0 +1,262 @@
+"""Persistent scan history in SQLite.
+
+Every recorded scan is one row: timestamp, symbology, payload, source (the
+camera, image or video it came from) and polygon. add() never touches the
+database; it queues the scan for a writer thread that commits in batches,
+so recording from the GUI thread stays cheap however fast scans arrive.
+Scans waiting for their batch are readable from pending().
+
+SQLite assigns the ids when a batch is inserted, so several ScanHistory
+objects (or processes) can share one file. Ids grow by one per row and only
+the oldest rows are ever deleted (once there are more than max_rows), so the
+written scans occupy the id range first_id..last_id and the pending ones
+come after it. Views page through that range by id, and exports stream rows
+in id order with a constant-size buffer.
+"""
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+COLUMNS = ('id', 'timestamp', 'symbology', 'payload', 'source', 'polygon')
+FLUSH_POLL_SECONDS = 0.1
+EXPORT_FETCH_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    symbology TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    source TEXT NOT NULL,
+    polygon TEXT NOT NULL
+)
+"""
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL lets the GUI and exports read while the writer commits
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+# Exports are formatted by SQLite, much faster than row by row in Python (json_object
+# needs the JSON functions built into SQLite since 3.38)
+TIMESTAMP_SQL = "strftime('%Y-%m-%dT%H:%M:%f', timestamp, 'unixepoch', 'localtime')"
+EXPORT_QUERIES = {
+    'csv': f"SELECT id, {TIMESTAMP_SQL}, symbology, payload, source, polygon FROM scans ORDER BY id",
+    'jsonl': (f"SELECT json_object('id', id, 'timestamp', {TIMESTAMP_SQL}, 'symbology', symbology, "
+              f"'payload', payload, 'source', source, 'polygon', json(polygon)) FROM scans ORDER BY id"),
+}
+
+
+class ScanHistoryError(Exception):
+    """Raised once the writer thread has failed; the scans it couldn't write stay pending"""
+
+
+class ScanHistory:
+    """SQLite scan log with batched writes on a background thread.
+
+    Rows are (id, timestamp, symbology, payload, source, polygon) tuples, with
+    the polygon as a list of (x, y) points and an id of None while pending.
+    The writer commits once batch_size scans are waiting or flush_interval
+    seconds after the first of them. If a write fails the writer stops:
+    error holds the exception and add() and flush() raise ScanHistoryError.
+    """
+
+    def __init__(self, path, max_rows=5_000_000, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        connection = connect(path)
+        try:
+            with connection:
+                connection.execute(SCHEMA)
+            self.first_id, self.last_id = self._id_range(connection)
+        finally:
+            connection.close()
+        self.error = None
+        self._reader = None  # Connection of the thread that reads (the GUI); see rows()
+        self._pending = deque()  # Rows queued for the writer, oldest first
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write, name='scan-history-writer', daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _id_range(connection):
+        first_id, last_id = connection.execute('SELECT MIN(id), MAX(id) FROM scans').fetchone()
+        return first_id or 1, last_id or 0
+
+    def _check_writer(self):
+        if self.error is not None:
+            raise ScanHistoryError(f"Writing the scan history failed: {self.error}") from self.error
+        if self._closed or not self._writer.is_alive():
+            raise ScanHistoryError("The scan history is closed")
+
+    def add(self, symbology, payload, source, polygon, timestamp=None):
+        """Record a scan without blocking"""
+        self._check_writer()
+        polygon = [(int(x), int(y)) for x, y in polygon]
+        row = (None, timestamp or time.time(), symbology, payload, source, polygon)
+        with self._lock:
+            self._pending.append(row)
+        self._queue.put(row)
+
+    def count(self):
+        with self._lock:
+            return self.last_id - self.first_id + 1 + len(self._pending)
+
+    def snapshot(self):
+        """(last_id, pending rows oldest first), taken together so they don't overlap or leave a gap"""
+        with self._lock:
+            return self.last_id, tuple(self._pending)
+
+    def rows(self, first_id, last_id):
+        """Written rows with ids in [first_id, last_id], newest first.
+
+        Meant for one reading thread (the GUI), which gets its own connection.
+        """
+        if self._reader is None:
+            self._reader = connect(self.path)
+        return [
+            row[:5] + (json.loads(row[5]),)
+            for row in self._reader.execute(
+                'SELECT id, timestamp, symbology, payload, source, polygon FROM scans '
+                'WHERE id BETWEEN ? AND ? ORDER BY id DESC', (first_id, last_id))
+        ]
+
+    def flush(self, timeout=None):
+        """Wait until every scan added so far is committed; False if timeout ran out first.
+
+        Raises ScanHistoryError instead of waiting on a writer that has failed.
+        """
+        self._check_writer()
+        done = threading.Event()
+        self._queue.put(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(FLUSH_POLL_SECONDS):
+            if not self._writer.is_alive():
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        if self.error is not None:
+            self._check_writer()
+        return True
+
+    def export(self, file, format='csv'):
+        """Write every scan, oldest first, to an open text file; returns the row count.
+
+        Rows are fetched EXPORT_FETCH_ROWS at a time on a connection of the
+        calling thread, so memory stays flat however long the history is.
+        """
+        if format not in EXPORT_QUERIES:
+            raise ValueError(f"Unknown export format: {format}")
+        self.flush()
+        writer = None
+        if format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+        count = 0
+        connection = connect(self.path)
+        try:
+            cursor = connection.execute(EXPORT_QUERIES[format])
+            while True:
+                batch = cursor.fetchmany(EXPORT_FETCH_ROWS)
+                if not batch:
+                    break
+                if writer:
+                    writer.writerows(batch)
+                else:
+                    file.write('\n'.join(row[0] for row in batch))
+                    file.write('\n')
+                count += len(batch)
+        finally:
+            connection.close()
+        return count
+
+    def export_to_path(self, path, format=None):
+        """Export to a file, picking the format from its extension unless given"""
+        if format is None:
+            format = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.json') else 'csv'
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            return self.export(f, format)
+
+    def close(self):
+        """Commit what is pending and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        if self._reader is not None:
+            self._reader.close()
+
+    def _write(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            # Gather a batch: up to batch_size rows or flush_interval seconds, cut short by flush()/close()
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with connection:
+                        connection.executemany(
+                            'INSERT INTO scans (timestamp, symbology, payload, source, polygon) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            [row[1:5] + (json.dumps(row[5], separators=(',', ':')),) for row in batch])
+                        first_id, last_id = self._id_range(connection)
+                        first_id = self._trim(connection, first_id, last_id)
+                except Exception as e:
+                    # Stop rather than drop scans; they stay pending and add()/flush() report the error
+                    self.error = e
+                    running = False
+                else:
+                    with self._lock:
+                        for _ in batch:
+                            self._pending.popleft()
+                        self.first_id, self.last_id = first_id, last_id
+            for waiter in waiters:
+                waiter.set()
+        # Wake anyone still waiting in flush()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        connection.close()
+
+    def _trim(self, connection, first_id, newest_id):
+        """Delete the oldest rows beyond max_rows (inside the writer's transaction); returns the new first id"""
+        cutoff = newest_id - self.max_rows
+        if self.max_rows and cutoff >= first_id:
+            connection.execute('DELETE FROM scans WHERE id <= ?', (cutoff,))
+            return cutoff + 1
+        return first_id
@@ -0,0 +1,294 @@
+"""Symbol decoding shared by the web app and the desktop scanner.
+
+Every symbology is read by one engine: zbar (through pyzbar) or libdmtx.
+A Scanner is built for the symbologies a caller needs and runs only their
+engines. One zbar pass covers all enabled zbar symbologies and is limited to
+them with pyzbar's symbols= filter; libdmtx runs only when Data Matrix is
+enabled. Results are dicts in the web API's format:
+
+    {'type': 'QR-CODE', 'data': '...', 'points': [(x, y), ...],
+     'rect': {'left': ..., 'top': ..., 'width': ..., 'height': ...}}
+
+Data Matrix results also carry the 'stage' of the preprocessing ladder that
+decoded them. The ladder is built for tight crops (YOLO boxes, tracked
+regions); whole frames or photos are decoded with full_frame=True, which
+runs only a shrunk libdmtx pass.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import ZBarSymbol, decode as pyzbar_decode
+from pylibdmtx import pylibdmtx as libdmtx
+
+# Data Matrix escalation ladder: the side length small images are upscaled to,
+# and the rotations tried last
+DATAMATRIX_MIN_SIDE = 120
+DATAMATRIX_ROTATIONS = (45, 22.5, -22.5)
+DATAMATRIX_BUDGET_MS = 300
+
+# Symbologies that can be enabled: name -> (result type, engine)
+SYMBOLOGIES = {
+    'qr-code': ('QR-CODE', 'zbar'),
+    'data-matrix': ('DATA-MATRIX', 'libdmtx'),
+    'ean-13': ('EAN-13', 'zbar'),
+    'ean-8': ('EAN-8', 'zbar'),
+    'upc-a': ('UPC-A', 'zbar'),
+    'upc-e': ('UPC-E', 'zbar'),
+    'code-128': ('CODE-128', 'zbar'),
+    'code-39': ('CODE-39', 'zbar'),
+}
+DEFAULT_SYMBOLOGIES = ('qr-code', 'data-matrix')
+
+# pyzbar's symbol for each zbar symbology
+ZBAR_SYMBOLS = {
+    'qr-code': ZBarSymbol.QRCODE,
+    'ean-13': ZBarSymbol.EAN13,
+    'ean-8': ZBarSymbol.EAN8,
+    'upc-a': ZBarSymbol.UPCA,
+    'upc-e': ZBarSymbol.UPCE,
+    'code-128': ZBarSymbol.CODE128,
+    'code-39': ZBarSymbol.CODE39,
+}
+
+
+def parse_symbologies(value):
+    """Symbology names from a comma-separated setting such as 'qr-code,data-matrix'"""
+    return tuple(name.strip() for name in value.split(',') if name.strip())
+
+
+def decode_zbar(gray, symbologies, budget_ms=None, full_frame=False):
+    """Decode the given zbar symbologies in one pass (zbar has no time limit, so budget_ms is unused)"""
+    by_symbol = {ZBAR_SYMBOLS[name].name: name for name in symbologies}
+    results = []
+    for obj in pyzbar_decode(gray, symbols=[ZBAR_SYMBOLS[name] for name in symbologies]):
+        rect = obj.rect
+        results.append({
+            'type': SYMBOLOGIES[by_symbol.get(obj.type, symbologies[0])][0],
+            'data': obj.data.decode('utf-8'),
+            'points': [(p.x, p.y) for p in obj.polygon],
+            'rect': {
+                'left': rect.left,
+                'top': rect.top,
+                'width': rect.width,
+                'height': rect.height
+            }
+        })
+    return results
+
+
+def datamatrix_points(rect, height):
+    """Axis-aligned corners of a libdmtx result in top-left image coordinates.
+
+    libdmtx works with a bottom-left origin and reports the symbol's finder
+    corner plus the opposite corner, so width/height can be negative.
+    """
+    xs = (rect.left, rect.left + rect.width)
+    ys = (height - rect.top, height - (rect.top + rect.height))
+    left, right = min(xs), max(xs)
+    top, bottom = min(ys), max(ys)
+    return [(left, top), (right, top), (right, bottom), (left, bottom)]
+
+
+def datamatrix_stages(gray, full_frame=False):
+    """Yield (stage, image, to_crop, options) from the cheapest attempt to the most expensive.
+
+    to_crop is the 2x3 affine transform mapping stage image coordinates back
+    onto the crop; options are extra libdmtx.decode arguments. A full frame
+    gets the shrunk pass only: a code can be any size in it and padding,
+    thresholding or rotating the whole frame costs the entire budget.
+    """
+    height, width = gray.shape[:2]
+    min_side = min(height, width)
+
+    shrink = 2 if min_side >= 2 * DATAMATRIX_MIN_SIDE else 1
+    identity = np.float32([[1, 0, 0], [0, 1, 0]])
+    if full_frame:
+        yield 'fast', gray, identity, {'shrink': shrink}
+        return
+
+    # Fast pass: shrink large crops and ignore edges far smaller than a YOLO crop's code
+    yield 'fast', gray, identity, {'shrink': shrink, 'min_edge': max(min_side // (4 * shrink), 1)}
+
+    # YOLO boxes are tight, so add the quiet zone libdmtx needs to find the L finder
+    pad = max(min_side // 4, 4)
+    image = cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+    to_crop = np.float32([[1, 0, -pad], [0, 1, -pad]])
+    yield 'quiet-zone', image, to_crop, {}
+
+    if min_side < DATAMATRIX_MIN_SIDE:
+        scale = int(np.ceil(DATAMATRIX_MIN_SIDE / min_side))
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        to_crop = np.float32([[1 / scale, 0, -pad], [0, 1 / scale, -pad]])
+        yield 'upscale', image, to_crop, {}
+
+    block_size = max((min(image.shape[:2]) // 8) | 1, 3)
+    image = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                  cv2.THRESH_BINARY, block_size, 2)
+    yield 'adaptive-threshold', image, to_crop, {}
+
+    center = (image.shape[1] / 2, image.shape[0] / 2)
+    for angle in DATAMATRIX_ROTATIONS:
+        rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(image, rotation, (image.shape[1], image.shape[0]),
+                                 flags=cv2.INTER_LINEAR, borderValue=255)
+        # Undo the rotation, then the earlier padding/upscaling
+        undo = np.vstack([cv2.invertAffineTransform(rotation), [0, 0, 1]])
+        yield f'rotate-{angle:g}', rotated, (to_crop @ undo).astype(np.float32), {}
+
+
+def decode_datamatrix(gray, symbologies=('data-matrix',), budget_ms=None, full_frame=False):
+    """Decode Data Matrix using libdmtx, escalating preprocessing until budget_ms runs out.
+
+    Each result reports the stage of the ladder that decoded it; see
+    datamatrix_stages for full_frame, which also reads every code in the
+    image instead of stopping at the first.
+    """
+    if budget_ms is None:
+        budget_ms = DATAMATRIX_BUDGET_MS
+    if min(gray.shape[:2]) == 0:
+        return []
+    deadline = time.monotonic() + budget_ms / 1000.0
+    # A crop holds one code; a whole frame can hold several, bounded only by the timeout
+    count = {} if full_frame else {'max_count': 1}
+
+    for stage, stage_image, to_crop, options in datamatrix_stages(gray, full_frame):
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            break
+
+        messages = libdmtx.decode(stage_image, timeout=remaining_ms, **count, **options)
+        if not messages:
+            continue
+
+        results = []
+        for msg in messages:
+            corners = np.float32(datamatrix_points(msg.rect, stage_image.shape[0])).reshape(-1, 1, 2)
+            points = [(int(round(x)), int(round(y))) for x, y in cv2.transform(corners, to_crop).reshape(-1, 2)]
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+
+            results.append({
+                'type': 'DATA-MATRIX',
+                'data': msg.data.decode('utf-8'),
+                'points': points,
+                'rect': {
+                    'left': min(xs),
+                    'top': min(ys),
+                    'width': max(xs) - min(xs),
+                    'height': max(ys) - min(ys)
+                },
+                'stage': stage
+            })
+        return results
+
+    return []
+
+
+# Decoder engines: name -> function(gray, symbologies, budget_ms, full_frame) returning results
+ENGINES = {
+    'zbar': decode_zbar,
+    'libdmtx': decode_datamatrix,
+}
+
+
+def register_symbology(name, result_type, engine):
+    """Make a symbology available to scanners, read by a registered engine"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown decoder engine: {engine}")
+    SYMBOLOGIES[name] = (result_type, engine)
+
+
+def register_engine(name, decode):
+    """Add a decoder engine; decode(gray, symbologies, budget_ms, full_frame) returns result dicts"""
+    ENGINES[name] = decode
+
+
+class Scanner:
+    """Decodes the enabled symbologies, running each engine at most once per image.
+
+    Engines run in the order the symbologies were given, so list the cheap
+    ones first when decode(first_hit=True) should stop early. The time every
+    engine pass takes is added to the scanner's totals and, when decode() is
+    given a timings dict, to that dict in seconds. A pass is keyed by its
+    symbology, or by names joined with '+' when one zbar pass reads several.
+    """
+
+    def __init__(self, symbologies=DEFAULT_SYMBOLOGIES, datamatrix_budget_ms=DATAMATRIX_BUDGET_MS):
+        unknown = [name for name in symbologies if name not in SYMBOLOGIES]
+        if unknown:
+            raise ValueError(f"Unknown symbologies: {', '.join(unknown)} "
+                             f"(expected some of {', '.join(SYMBOLOGIES)})")
+        self.symbologies = tuple(dict.fromkeys(symbologies))
+        self.datamatrix_budget_ms = datamatrix_budget_ms
+        self._totals = {}  # pass key -> [calls, seconds, decoded]
+        self._lock = threading.Lock()
+
+    def enabled(self, symbology):
+        return symbology in self.symbologies
+
+    def result_type(self, symbology):
+        return SYMBOLOGIES[symbology][0]
+
+    def passes(self, symbologies=None):
+        """(engine, symbologies) to run, in order, for the enabled subset of symbologies"""
+        wanted = self.symbologies if symbologies is None else [s for s in self.symbologies if s in symbologies]
+        grouped = {}
+        for name in wanted:
+            grouped.setdefault(SYMBOLOGIES[name][1], []).append(name)
+        return [(engine, tuple(names)) for engine, names in grouped.items()]
+
+    def decode(self, image, symbologies=None, budget_ms=None, first_hit=False, timings=None, full_frame=False):
+        """Decode a BGR or grayscale image.
+
+        symbologies narrows the enabled set for this call, budget_ms overrides
+        the Data Matrix budget and first_hit stops after the first engine that
+        finds something. Pass full_frame for whole camera frames or photos
+        rather than crops around a code.
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if budget_ms is None:
+            budget_ms = self.datamatrix_budget_ms
+        results = []
+        for engine, names in self.passes(symbologies):
+            start = time.perf_counter()
+            found = ENGINES[engine](gray, names, budget_ms, full_frame)
+            elapsed = time.perf_counter() - start
+            key = '+'.join(names)
+            with self._lock:
+                totals = self._totals.setdefault(key, [0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] += len(found)
+            if timings is not None:
+                timings[key] = timings.get(key, 0.0) + elapsed
+            results.extend(found)
+            if found and first_hit:
+                break
+        return results
+
+    def stats(self):
+        """Calls, decoded codes and mean milliseconds of each engine pass so far"""
+        with self._lock:
+            return {
+                key: {'calls': calls, 'decoded': decoded, 'mean_ms': round(seconds * 1000 / calls, 3)}
+                for key, (calls, seconds, decoded) in self._totals.items()
+            }
+
+
+# Scanner of a decode pool worker process, built by init_process_scanner
+process_scanner = None
+
+
+def init_process_scanner(symbologies, datamatrix_budget_ms):
+    """Process pool initializer: build only a Scanner, none of the caller's model or threads"""
+    global process_scanner
+    process_scanner = Scanner(symbologies, datamatrix_budget_ms=datamatrix_budget_ms)
+
+
+def decode_in_process(job):
+    """Decode one (symbology, crop) pair in a pool worker, returning (results, seconds per pass)"""
+    symbology, crop = job
+    timings = {}
+    return process_scanner.decode(crop, symbologies=(symbology,), timings=timings), timings
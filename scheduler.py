@@ -0,0 +1,122 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SchedulerBusy(Exception):
+    """Raised when the inference queue is full"""
+
+
+class InferenceScheduler:
+    """Groups images from concurrent requests into batched forward passes.
+
+    A single worker thread owns the model: it waits for the first queued image,
+    then keeps collecting until max_batch_size images are queued or max_wait_ms
+    has passed, runs infer_batch once and resolves each caller's Future with
+    its own result. The queue is bounded so a backlog fails fast instead of
+    growing latency without limit.
+    """
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10, max_queue=256):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.largest_batch = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """Queue an image, returning a Future for its inference result.
+
+        Raises SchedulerBusy when the scheduler is saturated.
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((image, future))
+        except queue.Full:
+            raise SchedulerBusy("Inference queue is full, try again later")
+        return future
+
+    def busy(self):
+        """Whether submit() would raise SchedulerBusy right now"""
+        return self._queue.full()
+
+    def infer(self, image, timeout=None):
+        return self.submit(image).result(timeout)
+
+    def infer_many(self, images, timeout=None):
+        futures = []
+        try:
+            for image in images:
+                futures.append(self.submit(image))
+        except SchedulerBusy:
+            # The request is answered with 503; don't run the part that was already queued
+            for future in futures:
+                future.cancel()
+            raise
+        return [future.result(timeout) for future in futures]
+
+    def stop(self):
+        self._running = False
+        self._queue.put((None, None))
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'batches': self.batches,
+                'images': self.images,
+                'mean_batch_size': self.images / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = [(image, future) for image, future in self._collect() if future is not None]
+            # Skip requests whose caller gave up while they were queued
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            images = [image for image, _ in batch]
+            futures = [future for _, future in batch]
+            # Drop the images before answering, so callers can free them (they may be shared memory views)
+            batch = None
+            try:
+                outputs = self.infer_batch(images)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            finally:
+                images = None
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+            with self._lock:
+                self.batches += 1
+                self.images += len(futures)
+                self.largest_batch = max(self.largest_batch, len(futures))
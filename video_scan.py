@@ -0,0 +1,132 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'm4v'}
+
+
+class FrameSampler:
+    """Skips frames that barely differ from the last frame that was kept.
+
+    Frames are compared as small grayscale thumbnails by mean absolute
+    difference, which costs far less than decoding them. A frame is always
+    kept once max_gap seconds have passed since the last kept one, so a static
+    scene is still sampled now and then.
+    """
+
+    def __init__(self, diff_threshold=6.0, max_gap=1.0, thumb_width=64):
+        self.diff_threshold = diff_threshold
+        self.max_gap = max_gap
+        self.thumb_width = thumb_width
+        self.last_thumb = None
+        self.last_time = None
+
+    def accept(self, frame, timestamp):
+        height, width = frame.shape[:2]
+        thumb_size = (self.thumb_width, max(int(height * self.thumb_width / width), 1))
+        thumb = cv2.cvtColor(cv2.resize(frame, thumb_size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+        keep = (
+            self.last_thumb is None
+            or timestamp - self.last_time >= self.max_gap
+            or float(np.mean(cv2.absdiff(thumb, self.last_thumb))) >= self.diff_threshold
+        )
+        if keep:
+            self.last_thumb = thumb
+            self.last_time = timestamp
+        return keep
+
+
+class VideoReader:
+    """Decodes and samples video frames on a background thread.
+
+    Sampled (frame_index, timestamp_seconds, frame) tuples are handed over
+    through a small bounded queue, so reading the next frames overlaps with
+    scanning the current ones without buffering the whole video. stride > 1
+    skips frames with grab(), which avoids decoding them to pixels at all.
+    """
+
+    _END = object()
+
+    def __init__(self, path, sampler=None, stride=1, queue_size=8):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        self.sampler = sampler or FrameSampler()
+        self.stride = max(stride, 1)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='video-reader', daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        index = 0
+        try:
+            while not self._stopped.is_set():
+                if index % self.stride and self.capture.grab():
+                    index += 1
+                    continue
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                self.frames_read += 1
+                timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 or index / self.fps
+                if self.sampler.accept(frame, timestamp):
+                    self.frames_sampled += 1
+                    if not self._put((index, timestamp, frame)):
+                        break
+                index += 1
+        finally:
+            self.capture.release()
+            self._put(self._END)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            yield item
+
+    def batches(self, max_size):
+        """Yield lists of sampled frames: whatever is ready, up to max_size, never waiting for more"""
+        batch = []
+        for item in self:
+            batch.append(item)
+            while len(batch) < max_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._END:
+                    yield batch
+                    return
+                batch.append(item)
+            yield batch
+            batch = []
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def stats(self):
+        return {
+            'fps': self.fps,
+            'frame_count': self.frame_count,
+            'frames_read': self.frames_read,
+            'frames_sampled': self.frames_sampled,
+        }